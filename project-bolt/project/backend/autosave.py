@@ -0,0 +1,89 @@
+"""Server-side support for the draft autosave pipeline."""
+import asyncio
+import hashlib
+import json
+import os
+
+# How long a draft's first save in a burst waits for newer saves to arrive
+# before it is written. Saves that arrive while a write is in flight are
+# coalesced regardless.
+AUTOSAVE_COALESCE_SECONDS = float(os.getenv("AUTOSAVE_COALESCE_MS", "200")) / 1000
+
+
+def content_hash(title, content, excerpt, featured_image):
+    """Fingerprint the stored body fields of a draft."""
+    payload = json.dumps([title, content, excerpt, featured_image], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def taxonomy_hash(categories, tags):
+    """Fingerprint a draft's category and tag names, ignoring order."""
+    payload = json.dumps([sorted(set(categories)), sorted(set(tags))], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class _Slot:
+    __slots__ = ("lock", "payload", "waiter")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.payload = None
+        self.waiter = None
+
+
+class Coalescer:
+    """Collapse bursts of writes for the same key into as few writes as possible.
+
+    At most one write per key is in flight. Submissions arriving meanwhile
+    only replace the pending payload; when the in-flight write finishes, the
+    latest pending payload is written once and every submitter that was
+    waiting on it receives that write's result.
+    """
+
+    def __init__(self, window=0.0):
+        self.window = window
+        self._slots = {}
+        self._submitted = 0
+        self._flushed = 0
+
+    async def submit(self, key, payload, flush):
+        """Queue ``payload`` for ``key`` and return the result of ``await flush(payload)``
+        for the write that covers it."""
+        self._submitted += 1
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _Slot()
+
+        slot.payload = payload
+        if slot.waiter is None:
+            slot.waiter = asyncio.get_running_loop().create_future()
+            asyncio.ensure_future(self._drain(key, slot, flush))
+        return await asyncio.shield(slot.waiter)
+
+    async def _drain(self, key, slot, flush):
+        if self.window:
+            await asyncio.sleep(self.window)
+
+        async with slot.lock:
+            payload, waiter = slot.payload, slot.waiter
+            slot.payload = slot.waiter = None
+            self._flushed += 1
+            try:
+                waiter.set_result(await flush(payload))
+            except Exception as e:
+                waiter.set_exception(e)
+
+        if slot.waiter is None and not slot.lock.locked() and self._slots.get(key) is slot:
+            del self._slots[key]
+
+    def stats(self):
+        return {
+            "window_seconds": self.window,
+            "submitted": self._submitted,
+            "written": self._flushed,
+            "coalesced": self._submitted - self._flushed,
+            "pending": len(self._slots),
+        }
+
+
+autosave_coalescer = Coalescer(AUTOSAVE_COALESCE_SECONDS)
@@ -0,0 +1,122 @@
+"""Concurrency benchmark for the Blog API.
+
+Starts ``--clients`` threads that each issue ``--requests`` GETs against a
+running server and prints latency percentiles as JSON. Run it once against a
+build that blocks the event loop and once against one that doesn't to compare
+tail latency, e.g.::
+
+    python benchmarks/concurrency.py --clients 200 --requests 50 --path /api/posts
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def client(base, next_request, count, latencies, errors, start_gate):
+    """Issue ``count`` requests on one keep-alive connection.
+
+    ``next_request(i, previous_body)`` returns the ``(method, path, body)``
+    of request ``i``; ``previous_body`` is the body of the last successful
+    response, so a request can depend on what the server returned.
+    """
+    conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=60)
+    previous_body = None
+    start_gate.wait()
+    for i in range(count):
+        method, path, body = next_request(i, previous_body)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+                continue
+        except Exception as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=60)
+            continue
+        latencies.append(time.perf_counter() - started)
+        previous_body = data
+    conn.close()
+
+
+def run(url, paths, clients, requests_per_client):
+    return run_requests(
+        url, lambda index: lambda i, _: ("GET", paths[i % len(paths)], None),
+        clients, requests_per_client, paths=paths,
+    )
+
+
+def run_requests(url, make_client, clients, requests_per_client, **details):
+    """Run ``clients`` concurrent clients and summarize their latencies.
+
+    ``make_client(index)`` returns the ``next_request`` function of one
+    client (see ``client``). ``details`` are copied into the result.
+    """
+    base = urlsplit(url)
+    latencies = []
+    errors = []
+    start_gate = threading.Event()
+    threads = [
+        threading.Thread(
+            target=client,
+            args=(base, make_client(index), requests_per_client, latencies, errors, start_gate),
+        )
+        for index in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    start_gate.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    to_ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        "url": url,
+        **details,
+        "clients": clients,
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": to_ms(percentile(latencies, 50)),
+            "p95": to_ms(percentile(latencies, 95)),
+            "p99": to_ms(percentile(latencies, 99)),
+            "max": to_ms(max(latencies) if latencies else None),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", action="append", dest="paths",
+                        help="Path to request; repeat to rotate between several")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+    args = parser.parse_args()
+
+    result = run(args.url, args.paths or ["/api/posts"], args.clients, args.requests)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Seed the configured database with generated posts for benchmarking.
+
+The data is generated from ``--seed``, so two runs with the same options
+produce the same posts, categories and tags. Posts are written through
+the bulk import path, e.g.::
+
+    DB_NAME=blog_bench python benchmarks/seed.py --posts 100000 --categories 50 --tags 500 --reset
+
+Set ``DB_ENGINE=sqlite`` (and ``SQLITE_PATH``) to seed an SQLite database
+instead, e.g. to compare the two engines with the same suite.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import DB_CONFIG, DB_ENGINE, SQLITE_PATH, connect  # noqa: E402
+from migrations import create_tables  # noqa: E402
+from transfer import IMPORT_BATCH_SIZE, import_posts  # noqa: E402
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute irure "
+    "in reprehenderit voluptate velit esse cillum fugiat nulla pariatur excepteur sint "
+    "occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim id est"
+).split()
+
+# Imported posts are written as user 1; the user is kept by --reset
+AUTHOR = {
+    "id": 1,
+    "name": "Benchmark Author",
+    "email": "bench@example.com",
+    "password": "!",
+    "avatar": "https://example.com/avatar.png",
+}
+
+RESET_STATEMENTS = [
+    "DELETE FROM post_categories",
+    "DELETE FROM post_tags",
+    "DELETE FROM posts",
+    "DELETE FROM categories",
+    "DELETE FROM tags",
+]
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def ensure_author(conn):
+    """Create the author imported posts belong to, if it doesn't exist."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"INSERT INTO users ({', '.join(AUTHOR)}) VALUES ({', '.join(['%s'] * len(AUTHOR))})"
+            " ON DUPLICATE KEY UPDATE id = id",
+            list(AUTHOR.values())
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def generate_posts(rng, count, categories, tags, words, draft_ratio):
+    """Yield ``count`` posts as NDJSON lines."""
+    for i in range(count):
+        paragraphs = []
+        remaining = max(1, int(rng.gauss(words, words / 4)))
+        while remaining > 0:
+            length = min(remaining, rng.randint(40, 120))
+            paragraphs.append(f"<p>{sentence(rng, length)}</p>")
+            remaining -= length
+        yield json.dumps({
+            "title": f"{sentence(rng, rng.randint(3, 8))[:-1]} #{i + 1}",
+            "content": "".join(paragraphs),
+            "excerpt": sentence(rng, 20),
+            "status": "draft" if rng.random() < draft_ratio else "published",
+            "categories": rng.sample(categories, min(len(categories), rng.randint(1, 2))),
+            "tags": rng.sample(tags, min(len(tags), rng.randint(0, 5))),
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--words", type=int, default=600, help="Average words per post")
+    parser.add_argument("--draft-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--reset", action="store_true",
+                        help="Delete every post, category and tag first (users are kept)")
+    args = parser.parse_args()
+
+    create_tables()
+    conn = connect()
+    try:
+        if args.reset:
+            cursor = conn.cursor()
+            for statement in RESET_STATEMENTS:
+                cursor.execute(statement)
+            conn.commit()
+            cursor.close()
+        ensure_author(conn)
+
+        rng = random.Random(args.seed)
+        categories = [f"Category {i + 1}" for i in range(args.categories)]
+        tags = [f"tag-{i + 1}" for i in range(args.tags)]
+        started = time.perf_counter()
+        summary = import_posts(
+            conn,
+            generate_posts(rng, args.posts, categories, tags, args.words, args.draft_ratio),
+            args.batch_size,
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+
+    print(json.dumps({
+        "engine": DB_ENGINE,
+        "database": SQLITE_PATH if DB_ENGINE == "sqlite" else DB_CONFIG["database"],
+        "posts": summary["imported"],
+        "failed": summary["failed"],
+        "categories": args.categories,
+        "tags": args.tags,
+        "seed": args.seed,
+        "elapsed_seconds": round(elapsed, 3),
+        "posts_per_second": round(summary["imported"] / elapsed, 1) if elapsed else None,
+    }, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
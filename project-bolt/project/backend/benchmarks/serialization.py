@@ -0,0 +1,117 @@
+"""Serialization parity check and benchmark for the post list endpoints.
+
+Builds synthetic rows in the shape the database returns, renders them
+both through FastAPI's default path (validation against the
+response_model, jsonable_encoder, json.dumps) and through the orjson path
+the read endpoints use, fails if the two decode to different documents,
+and prints the time each path takes as JSON (tests/test_serialization.py
+checks the same parity on rows read from a database)::
+
+    python benchmarks/serialization.py --posts 100 --words 600
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import sys
+import time
+from typing import List, Union
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main as api  # noqa: E402
+
+
+def make_rows(count, words, summary=False):
+    started = datetime(2024, 1, 1, 12, 0, 0)
+    rows = []
+    for i in range(count):
+        created = started + timedelta(minutes=i, microseconds=i * 137)
+        row = {
+            "id": i + 1,
+            "title": f"Post \"{i}\" — ünïcode & <markup>",
+            "excerpt": None if i % 3 == 0 else f"Excerpt {i}",
+            "featured_image": None if i % 2 else f"https://example.com/{i}.jpg",
+            "status": "published" if i % 4 else "draft",
+            "reading_time": max(1, words // 200),
+            "created_at": created,
+            "updated_at": created + timedelta(seconds=5),
+            "published_at": None if i % 4 == 0 else created,
+            "author_id": 1,
+            "author_name": "Alex Writer",
+            "author_avatar": None if i % 5 == 0 else "https://example.com/avatar.jpg",
+        }
+        if not summary:
+            row["content"] = "<p>" + " ".join(f"word{j}" for j in range(words)) + "</p>"
+        rows.append(row)
+    return [
+        api._post_from_row(row, ["Development", "News"][: i % 3], [f"tag{i % 7}"])
+        for i, row in enumerate(rows)
+    ]
+
+
+def default_path(adapter, content):
+    """What FastAPI does for a handler returning ``content`` with a response_model."""
+    validated = adapter.validate_python(content)
+    return json.dumps(
+        jsonable_encoder(validated), ensure_ascii=False, allow_nan=False,
+        indent=None, separators=(",", ":"),
+    ).encode()
+
+
+def timed(fn, *args, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn(*args)
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--words", type=int, default=600)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    list_adapter = TypeAdapter(Union[List[api.Post], List[api.PostSummary]])
+    search_rows = make_rows(args.posts, args.words, summary=True)
+    for row in search_rows:
+        row["score"] = 1.5
+        row["highlight"] = "a <mark>match</mark>"
+    aware = make_rows(1, args.words)[0]
+    aware["updated_at"] = aware["updated_at"].replace(tzinfo=timezone.utc)
+
+    cases = {
+        "full": (list_adapter, make_rows(args.posts, args.words)),
+        "summary": (list_adapter, make_rows(args.posts, args.words, summary=True)),
+        "search": (TypeAdapter(List[api.SearchResult]), search_rows),
+        "single": (TypeAdapter(api.Post), make_rows(1, args.words)[0]),
+        "single_utc": (TypeAdapter(api.Post), aware),
+    }
+
+    report = {"posts": args.posts, "words": args.words, "cases": {}}
+    failed = False
+    for name, (adapter, content) in cases.items():
+        fast = api._json_body(content)
+        default = default_path(adapter, content)
+        parity = json.loads(fast) == json.loads(default)
+        failed = failed or not parity
+        default_ms = timed(default_path, adapter, content, rounds=args.rounds) * 1000
+        fast_ms = timed(api._json_body, content, rounds=args.rounds) * 1000
+        report["cases"][name] = {
+            "parity": parity,
+            "bytes": len(fast),
+            "default_ms": round(default_ms, 3),
+            "orjson_ms": round(fast_ms, 3),
+            "speedup": round(default_ms / fast_ms, 1) if fast_ms else None,
+        }
+
+    print(json.dumps(report, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
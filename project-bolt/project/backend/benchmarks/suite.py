@@ -0,0 +1,171 @@
+"""Benchmark suite for the Blog API.
+
+Runs each scenario against a running server, one after another, and
+prints one JSON document with throughput and latency percentiles per
+scenario, the commit under test and the options used. Seed the database
+with ``benchmarks/seed.py`` first, then e.g.::
+
+    python benchmarks/suite.py --clients 50 --requests 200 --output before.json
+
+Scenarios:
+
+    list_posts   GET /api/posts
+    get_post     GET /api/posts/{id} over ids of existing posts
+    categories   GET /api/categories
+    autosave     POST /api/drafts/autosave, each client editing its own draft
+    create_post  POST /api/posts
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from concurrency import run_requests
+
+
+def _json(payload):
+    return json.dumps(payload).encode()
+
+
+def list_posts(options, ids):
+    return lambda index: lambda i, _: ("GET", f"/api/posts?limit={options.page_size}", None)
+
+
+def get_post(options, ids):
+    def make_client(index):
+        rng = random.Random(options.seed + index)
+        return lambda i, _: ("GET", f"/api/posts/{rng.choice(ids)}", None)
+    return make_client
+
+
+def categories(options, ids):
+    return lambda index: lambda i, _: ("GET", "/api/categories", None)
+
+
+def autosave(options, ids):
+    run_id = int(time.time())
+
+    def make_client(index):
+        state = {"id": None, "content": "<p>Start</p>"}
+
+        def next_request(i, previous_body):
+            if previous_body and state["id"] is None:
+                state["id"] = json.loads(previous_body)["id"]
+            # Each save appends a few words, like a burst of typing would
+            state["content"] = state["content"][:-4] + f" edit {i}</p>"
+            return "POST", "/api/drafts/autosave", _json({
+                "id": state["id"],
+                "title": f"Benchmark draft {run_id}-{index}",
+                "content": state["content"],
+                "status": "draft",
+                "categories": ["Benchmark"],
+                "tags": ["autosave"],
+            })
+        return next_request
+    return make_client
+
+
+def create_post(options, ids):
+    run_id = int(time.time())
+
+    def make_client(index):
+        return lambda i, _: ("POST", "/api/posts", _json({
+            "title": f"Benchmark post {run_id}-{index}-{i}",
+            "content": "<p>" + " ".join(["benchmark"] * options.words) + "</p>",
+            "excerpt": "Created by the benchmark suite",
+            "status": "published",
+            "categories": ["Benchmark"],
+            "tags": ["benchmark", f"client-{index % 10}"],
+        }))
+    return make_client
+
+
+SCENARIOS = {
+    "list_posts": list_posts,
+    "get_post": get_post,
+    "categories": categories,
+    "autosave": autosave,
+    "create_post": create_post,
+}
+
+
+def fetch_post_ids(url, limit):
+    base = urlsplit(url)
+    conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=60)
+    try:
+        conn.request("GET", f"/api/posts?view=summary&limit={limit}")
+        response = conn.getresponse()
+        posts = json.loads(response.read())
+    finally:
+        conn.close()
+    return [post["id"] for post in posts]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--scenario", action="append", dest="scenarios", choices=SCENARIOS,
+                        help="Scenario to run; repeat for several (default: all)")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per client")
+    parser.add_argument("--warmup", type=int, default=5,
+                        help="Requests per client run before each scenario and not measured")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--words", type=int, default=600, help="Words per created post")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Also write the result to this file")
+    args = parser.parse_args()
+
+    ids = fetch_post_ids(args.url, 100)
+    scenarios = args.scenarios or list(SCENARIOS)
+    if "get_post" in scenarios and not ids:
+        parser.error("get_post needs existing posts; seed the database first")
+
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    results = {}
+    for name in scenarios:
+        make_client = SCENARIOS[name](args, ids)
+        if args.warmup:
+            run_requests(args.url, make_client, args.clients, args.warmup)
+        results[name] = run_requests(args.url, make_client, args.clients, args.requests)
+        print(f"{name}: {results[name]['throughput_rps']} req/s, "
+              f"p99 {results[name]['latency_ms']['p99']} ms", file=sys.stderr)
+
+    report = {
+        "commit": git_commit(),
+        "started_at": started_at,
+        "options": {
+            "url": args.url,
+            "clients": args.clients,
+            "requests_per_client": args.requests,
+            "warmup": args.warmup,
+            "page_size": args.page_size,
+            "words": args.words,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Caches for the Blog API."""
+from collections import OrderedDict
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+# Seconds a cached taxonomy listing stays fresh. Writes in this process
+# invalidate it immediately; the TTL bounds staleness across workers.
+TAXONOMY_CACHE_TTL = float(os.getenv("TAXONOMY_CACHE_TTL", "60"))
+
+# Rendered single-post responses: "memory" keeps them in each worker, "file"
+# shares them between the workers of one host through RESPONSE_CACHE_DIR.
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_DIR = os.getenv(
+    "RESPONSE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "blog-response-cache")
+)
+
+
+class TTLCache:
+    """A small key/value cache with per-entry expiry and explicit invalidation.
+
+    ``set`` takes the generation read before the value was computed and
+    drops the value if an invalidation happened in the meantime, so a slow
+    read racing a write can't put stale data back in the cache.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+        self._invalidated_at = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    @property
+    def invalidated_at(self):
+        """``time.monotonic()`` of the last invalidation."""
+        return self._invalidated_at
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._hits += 1
+                return entry[1]
+            self._entries.pop(key, None)
+            self._misses += 1
+            return None
+
+    def set(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, *keys):
+        """Drop the given keys, or every entry when called without keys."""
+        with self._lock:
+            if keys:
+                for key in keys:
+                    self._entries.pop(key, None)
+            else:
+                self._entries.clear()
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+            }
+
+
+class MemoryResponseCache:
+    """An LRU cache of encoded responses bounded by their total size in bytes.
+
+    Keys are strings; ``invalidate_prefix`` drops every key starting with a
+    prefix, which is how all cached versions of one post are removed.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def invalidate_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._bytes -= len(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+
+class FileResponseCache:
+    """A response cache kept as files in a directory shared by local workers.
+
+    Each entry is written to a temporary file and renamed into place, so
+    readers in other processes never see a partial entry. The file name
+    is the key's prefix (its part before the last ``:``) followed by a hash
+    of the full key, which keeps ``invalidate_prefix`` a directory scan.
+    When the directory grows past ``max_bytes``, the oldest entries are
+    removed.
+    """
+
+    # Writes between two size checks of the directory
+    PRUNE_INTERVAL = 64
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _path(self, key):
+        prefix, _, _ = key.rpartition(":")
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.directory, f"{_safe_name(prefix)}.{digest}")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                value = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_INTERVAL == 0
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self._evictions += 1
+
+    def invalidate_prefix(self, prefix):
+        # Prefixes passed here end at a ":" boundary of the key
+        name = _safe_name(prefix.rstrip(":")) + "."
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(name):
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if not entry.name.startswith(".tmp-"):
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "file",
+                "directory": self.directory,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+
+def _safe_name(prefix):
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in prefix)
+
+
+def make_response_cache(backend=RESPONSE_CACHE_BACKEND):
+    if backend == "memory":
+        return MemoryResponseCache(RESPONSE_CACHE_MAX_BYTES)
+    if backend == "file":
+        return FileResponseCache(RESPONSE_CACHE_DIR, RESPONSE_CACHE_MAX_BYTES)
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend!r}")
+
+
+# Category and tag listings with post counts
+taxonomy_cache = TTLCache(TAXONOMY_CACHE_TTL)
+
+# Rendered single-post JSON, keyed "post:<id>:<updated_at>", and its
+# compressed variants, keyed "post:<id>:<updated_at>.<encoding>"
+response_cache = make_response_cache()
@@ -0,0 +1,181 @@
+"""Response compression negotiated from Accept-Encoding.
+
+gzip is always available; brotli is used when the ``brotli`` package is
+installed and the client prefers it. Bodies smaller than
+``COMPRESSION_MIN_BYTES`` are sent as is, since the framing overhead
+outweighs the savings.
+"""
+import asyncio
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Bodies at least this large are compressed on a worker thread rather
+# than on the event loop
+OFFLOAD_BYTES = 64 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/xml",
+    "application/rss+xml", "application/atom+xml", "application/feed+json",
+    "text/",
+)
+
+SUPPORTED = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _weights(accept_encoding):
+    """Map each coding named in an Accept-Encoding header to its q-value."""
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    return weights
+
+
+def choose_encoding(accept_encoding):
+    """Return the supported encoding the client ranks highest, or None for identity.
+
+    On a tie the order of ``SUPPORTED`` decides, so brotli wins over gzip.
+    """
+    if not accept_encoding:
+        return None
+    weights = _weights(accept_encoding)
+
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def accepts(accept_encoding, encoding):
+    """Whether an Accept-Encoding header allows ``encoding``."""
+    weights = _weights(accept_encoding)
+    return weights.get(encoding, weights.get("*", 0.0)) > 0
+
+
+def _gzip_compressor():
+    # wbits 31: a deflate stream with gzip framing
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    streamer = _gzip_compressor()
+    return streamer.compress(body) + streamer.flush()
+
+
+def compressor(encoding):
+    """Return ``(compress_chunk, flush)`` callables for a streamed body."""
+    if encoding == "br":
+        streamer = brotli.Compressor(quality=BROTLI_QUALITY)
+        return streamer.process, streamer.finish
+    streamer = _gzip_compressor()
+    return streamer.compress, streamer.flush
+
+
+def is_compressible(content_type):
+    return content_type.split(";")[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses for clients that accept it.
+
+    Responses that already carry a Content-Encoding (such as precompressed
+    cache entries) pass through untouched. A streamed body is compressed
+    chunk by chunk as it is sent.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+
+        start = None
+        chunk = flush = None
+
+        async def send_wrapper(message):
+            nonlocal start, chunk, flush
+            if message["type"] == "http.response.start":
+                # Held back until the first body message shows whether the
+                # response is streamed and how large it is
+                start = message
+                return
+            if chunk is not None and message["type"] == "http.response.body":
+                # Later chunks of a compressed stream
+                data = chunk(message.get("body", b""))
+                if not message.get("more_body", False):
+                    data += flush()
+                await send({**message, "body": data})
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            headers = [(name, value) for name, value in start["headers"]]
+            first, start = start, None
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            names = {name.lower() for name, _ in headers}
+            content_type = next(
+                (value.decode("latin-1") for name, value in headers if name.lower() == b"content-type"), ""
+            )
+            eligible = (
+                b"content-encoding" not in names
+                and is_compressible(content_type)
+                and (more_body or len(body) >= self.minimum_size)
+            )
+            if eligible:
+                headers.append((b"vary", b"Accept-Encoding"))
+            if not (eligible and encoding):
+                await send({**first, "headers": headers})
+                await send(message)
+                return
+
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+            headers.append((b"content-encoding", encoding.encode()))
+            if more_body:
+                chunk, flush = compressor(encoding)
+                data = chunk(body)
+            else:
+                data = await compress_async(body, encoding)
+                headers.append((b"content-length", str(len(data)).encode()))
+            await send({**first, "headers": headers})
+            await send({**message, "body": data})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+async def compress_async(body, encoding):
+    """Compress ``body``, off the event loop when it is large."""
+    if len(body) < OFFLOAD_BYTES:
+        return compress(body, encoding)
+    return await asyncio.get_running_loop().run_in_executor(None, compress, body, encoding)
@@ -0,0 +1,524 @@
+"""Database configuration, connection pooling and async query execution."""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import functools
+import itertools
+import os
+import threading
+import time
+
+import mysql.connector
+
+import sqlite_backend
+from metrics import record_pool_wait, record_query
+
+# Storage engine: "mysql", or "sqlite" for an embedded database in SQLITE_PATH
+DB_ENGINE = os.getenv("DB_ENGINE", "mysql").strip().lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "blog.db")
+
+if DB_ENGINE not in ("mysql", "sqlite"):
+    raise ValueError(f"Unknown DB_ENGINE {DB_ENGINE!r}; expected 'mysql' or 'sqlite'")
+
+# Database configuration
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", "password"),
+    "database": os.getenv("DB_NAME", "blog_db"),
+    # Read and write TIMESTAMPs in UTC so Last-Modified headers are exact
+    "time_zone": "+00:00",
+}
+
+
+# Read replicas: a comma-separated list of "host[:port]" sharing the
+# primary's user, password and database, or of database files with SQLite
+DB_REPLICAS = [replica.strip() for replica in os.getenv("DB_REPLICAS", "").split(",") if replica.strip()]
+
+# Seconds after a write during which the writing client reads from the
+# primary, so it sees its own changes despite replication lag
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+
+def _replica_config(replica):
+    if DB_ENGINE == "sqlite":
+        return {"path": replica}
+    host, _, port = replica.partition(":")
+    config = dict(DB_CONFIG, host=host)
+    if port:
+        config["port"] = int(port)
+    return config
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Pool configuration
+POOL_CONFIG = {
+    "size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")),
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pre_ping": _env_flag("DB_POOL_PRE_PING", "true"),
+    "recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+}
+
+# Worker threads running blocking queries; defaults to the capacity of the
+# primary and replica pools so a worker never sits waiting for a connection
+# it can't get.
+EXECUTOR_WORKERS = int(
+    os.getenv(
+        "DB_EXECUTOR_WORKERS",
+        (POOL_CONFIG["size"] + POOL_CONFIG["max_overflow"]) * (1 + len(DB_REPLICAS))
+    )
+)
+
+
+def connect(config=DB_CONFIG):
+    """Open an unpooled connection to the configured storage engine."""
+    if DB_ENGINE == "sqlite":
+        return sqlite_backend.connect(config.get("path", SQLITE_PATH))
+    return mysql.connector.connect(**config)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class _TimedCursor:
+    """A cursor that reports the time of each statement to the metrics module."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, *args, **kwargs)
+        finally:
+            record_query(operation, time.perf_counter() - started)
+
+    def executemany(self, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, *args, **kwargs)
+        finally:
+            record_query(operation, time.perf_counter() - started)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _TimedConnection:
+    """A connection whose cursors and commits are timed."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return _TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            record_query("COMMIT", time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class ConnectionPool:
+    """A thread-safe pool of database connections.
+
+    Up to ``size`` connections are kept open between requests; when they are
+    all checked out, up to ``max_overflow`` extra connections may be opened and
+    are closed again on release. Borrowers wait at most ``timeout`` seconds for
+    a free connection. Idle connections are pinged on checkout when
+    ``pre_ping`` is set and replaced once they are older than ``recycle``
+    seconds (0 disables recycling).
+    """
+
+    def __init__(self, config, size=10, max_overflow=10, timeout=30.0, pre_ping=True, recycle=3600):
+        self.config = config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.recycle = recycle
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._born = {}
+        self._open = 0
+        self._in_use = 0
+
+        # Counters
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._recycled = 0
+        self._invalidated = 0
+
+    def _connect(self):
+        conn = _TimedConnection(connect(self.config))
+        self._born[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        self._born.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _validate(self, conn):
+        """Return a usable connection, replacing ``conn`` if it is stale or dead."""
+        age = time.monotonic() - self._born.get(id(conn), 0.0)
+        if self.recycle and age > self.recycle:
+            self._discard(conn)
+            self._recycled += 1
+            return self._connect()
+
+        if self.pre_ping and not conn.is_connected():
+            self._discard(conn)
+            self._invalidated += 1
+            return self._connect()
+
+        return conn
+
+    def acquire(self):
+        """Check out a connection, blocking for up to ``timeout`` seconds."""
+        return self.acquire_many(1)[0]
+
+    def acquire_many(self, count):
+        """Check out ``count`` connections, blocking for up to ``timeout`` seconds.
+
+        The connections are reserved together, so a borrower needing
+        several never holds some of them while waiting for the rest.
+        """
+        if count > self.size + self.max_overflow:
+            raise ValueError(f"Can't check out {count} connections from a pool of {self.size + self.max_overflow}")
+        waited_since = None
+        with self._cond:
+            while True:
+                if len(self._idle) + self.size + self.max_overflow - self._open >= count:
+                    idle = [self._idle.pop() for _ in range(min(count, len(self._idle)))]
+                    # Reserve slots for the rest; they are opened outside the lock
+                    self._open += count - len(idle)
+                    break
+
+                now = time.monotonic()
+                if waited_since is None:
+                    waited_since = now
+                    self._waits += 1
+                remaining = self.timeout - (now - waited_since)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    self._wait_time += now - waited_since
+                    raise PoolTimeout(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    )
+                self._cond.wait(remaining)
+
+            self._in_use += count
+            self._checkouts += count
+            waited = 0.0
+            if waited_since is not None:
+                waited = time.monotonic() - waited_since
+                self._wait_time += waited
+        record_pool_wait(waited)
+
+        conns = []
+        try:
+            while idle:
+                conns.append(self._validate(idle.pop()))
+            while len(conns) < count:
+                conns.append(self._connect())
+            return conns
+        except Exception:
+            for conn in conns + idle:
+                self._discard(conn)
+            with self._cond:
+                self._in_use -= count
+                self._open -= count
+                self._cond.notify_all()
+            raise
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back any open transaction."""
+        healthy = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy and len(self._idle) < self.size:
+                self._idle.append(conn)
+                conn = None
+            else:
+                self._open -= 1
+            # Waiters may need more than one connection, so wake them all
+            self._cond.notify_all()
+
+        if conn is not None:
+            self._discard(conn)
+
+    def close(self):
+        """Close every idle connection; checked-out connections close on release."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_seconds": round(self._wait_time, 6),
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "invalidated": self._invalidated,
+            }
+
+
+pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG)
+replica_pools = [ConnectionPool(_replica_config(replica), **POOL_CONFIG) for replica in DB_REPLICAS]
+
+
+# Read routing
+# Set for requests from a client that wrote within READ_YOUR_WRITES_SECONDS
+read_from_primary = contextvars.ContextVar("read_from_primary", default=False)
+_next_replica = itertools.count()
+
+
+def _read_pool():
+    if not replica_pools or read_from_primary.get():
+        return pool
+    return replica_pools[next(_next_replica) % len(replica_pools)]
+
+
+def replica_may_lag(since):
+    """Whether a read now might miss a write made at ``since`` (``time.monotonic()``).
+
+    True when the read would go to a replica and the write is recent
+    enough that the replica may not have applied it yet.
+    """
+    return (
+        bool(replica_pools) and not read_from_primary.get()
+        and time.monotonic() - since < READ_YOUR_WRITES_SECONDS
+    )
+
+
+READ_PRIMARY_COOKIE = "read_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _has_cookie(scope, name):
+    for header, value in scope["headers"]:
+        if header == b"cookie":
+            for item in value.decode("latin-1").split(";"):
+                if item.strip().partition("=")[0] == name:
+                    return True
+    return False
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware keeping a client's reads on the primary after it writes.
+
+    A successful write response sets a cookie lasting ``seconds``; requests
+    carrying it set ``read_from_primary``, which ``run_read`` obeys. Does
+    nothing when no replicas are configured.
+    """
+
+    def __init__(self, app, seconds=READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.cookie = (
+            f"{READ_PRIMARY_COOKIE}=1; Max-Age={max(1, round(seconds))}; Path=/; HttpOnly; SameSite=Lax"
+        ).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_pools:
+            await self.app(scope, receive, send)
+            return
+
+        token = None
+        if _has_cookie(scope, READ_PRIMARY_COOKIE):
+            token = read_from_primary.set(True)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message = {**message, "headers": [*message["headers"], (b"set-cookie", self.cookie)]}
+            await send(message)
+
+        writes = scope["method"] not in SAFE_METHODS
+        try:
+            await self.app(scope, receive, send_wrapper if writes else send)
+        finally:
+            if token is not None:
+                read_from_primary.reset(token)
+
+
+# Async access
+_executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="db")
+_executor_lock = threading.Lock()
+_submitted = 0
+_running = 0
+
+
+def _call_with_connection(source, fn, args, kwargs):
+    global _running
+    with _executor_lock:
+        _running += 1
+    try:
+        conn = source.acquire()
+        try:
+            return fn(conn, *args, **kwargs)
+        finally:
+            source.release(conn)
+    finally:
+        with _executor_lock:
+            _running -= 1
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run ``fn(conn, *args, **kwargs)`` on the database executor.
+
+    The blocking driver calls happen on a bounded thread pool with a
+    connection from the primary's pool, so a slow query never stalls the
+    event loop.
+    """
+    return await _run_on(pool, fn, args, kwargs)
+
+
+async def run_read(fn, *args, **kwargs):
+    """Like ``run_db``, but on a replica when any are configured.
+
+    Replicas are used in turn. Clients that wrote recently (see
+    ``ReadYourWritesMiddleware``) keep reading from the primary.
+    """
+    return await _run_on(_read_pool(), fn, args, kwargs)
+
+
+async def _run_on(source, fn, args, kwargs):
+    global _submitted
+    with _executor_lock:
+        _submitted += 1
+    loop = asyncio.get_running_loop()
+    # Run in a copy of the caller's context so query metrics are credited
+    # to the request being served
+    context = contextvars.copy_context()
+    try:
+        return await loop.run_in_executor(
+            _executor, functools.partial(context.run, _call_with_connection, source, fn, args, kwargs)
+        )
+    finally:
+        with _executor_lock:
+            _submitted -= 1
+
+
+# Sentinel returned by next() once an iterated generator is exhausted
+_DONE = object()
+
+
+class DBIteration:
+    """Async iterator over the items of a generator run by ``iterate_db``.
+
+    The connections are released once the generator is exhausted, fails
+    or is closed with ``aclose``; pass ``aclose`` as a streaming
+    response's background task so they are also released when the
+    client goes away before the first item is sent.
+    """
+
+    def __init__(self, loop, context, conns, iterator, first):
+        self._loop = loop
+        self._context = context
+        self._conns = conns
+        self._iterator = iterator
+        self._next = first
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = self._next
+        if item is _DONE:
+            await self.aclose()
+            raise StopAsyncIteration
+        try:
+            self._next = await self._loop.run_in_executor(
+                _executor, self._context.run, next, self._iterator, _DONE
+            )
+        except Exception:
+            await self.aclose()
+            raise
+        return item
+
+    async def aclose(self):
+        conns, self._conns = self._conns, []
+        self._next = _DONE
+        if not conns:
+            return
+        try:
+            await self._loop.run_in_executor(_executor, self._iterator.close)
+        finally:
+            for conn in conns:
+                await self._loop.run_in_executor(_executor, pool.release, conn)
+
+
+async def iterate_db(fn, *args, connections=1, **kwargs):
+    """Start iterating the generator ``fn(*conns, *args, **kwargs)`` on the database executor.
+
+    ``connections`` pooled connections are checked out together and kept
+    for the whole iteration. The first item is produced before this
+    returns, so a pool timeout or a failing query raises here, before a
+    response streaming the items has sent its status. Each item is
+    produced by a blocking ``next`` call on the executor, so items should
+    be coarse (a chunk of rows, not one row).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    conns = await loop.run_in_executor(_executor, context.run, pool.acquire_many, connections)
+    iterator = None
+    try:
+        iterator = fn(*conns, *args, **kwargs)
+        first = await loop.run_in_executor(_executor, context.run, next, iterator, _DONE)
+    except BaseException:
+        try:
+            if iterator is not None:
+                await loop.run_in_executor(_executor, iterator.close)
+        finally:
+            for conn in conns:
+                await loop.run_in_executor(_executor, pool.release, conn)
+        raise
+    return DBIteration(loop, context, conns, iterator, first)
+
+
+def executor_stats():
+    with _executor_lock:
+        return {
+            "workers": EXECUTOR_WORKERS,
+            "running": _running,
+            "queued": max(0, _submitted - _running),
+        }
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=True)
@@ -0,0 +1,293 @@
+"""RSS, Atom and JSON Feed documents for the site, each category and each tag.
+
+Feeds are rendered ahead of time and stored gzipped in the ``feeds``
+table, one row per scope (``site``, ``category:<slug>`` or
+``tag:<slug>``) and format. A write to a published post calls
+``invalidate_feeds`` for the scopes listing it, which clears their
+bodies and bumps their version in the write's transaction; the next
+request for such a feed renders every format of its scope again. A
+rendering only stores a body if the version it read is still current, so
+a write racing it can't leave a stale feed behind.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime
+import gzip
+import hashlib
+import json
+import os
+from xml.sax.saxutils import escape, quoteattr
+
+from compression import GZIP_LEVEL
+
+FEED_SIZE = int(os.getenv("FEED_SIZE", "20"))
+SITE_TITLE = os.getenv("SITE_TITLE", "Blog")
+SITE_URL = os.getenv("SITE_URL", "http://localhost:5173").rstrip("/")
+
+SITE_SCOPE = "site"
+
+FORMATS = {
+    "rss": "application/rss+xml",
+    "atom": "application/atom+xml",
+    "json": "application/feed+json",
+}
+
+# Taxonomy table and link table/column of each scope kind
+SCOPE_TABLES = {
+    "category": ("categories", "post_categories", "category_id"),
+    "tag": ("tags", "post_tags", "tag_id"),
+}
+
+
+def _utc(value):
+    # TIMESTAMP columns come back naive, in UTC
+    return value.replace(tzinfo=timezone.utc)
+
+
+def post_url(post_id):
+    return f"{SITE_URL}/blogs/{post_id}"
+
+
+def render_rss(feed, items):
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>\n',
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel>',
+        f"<title>{escape(feed['title'])}</title>",
+        f"<link>{escape(SITE_URL)}</link>",
+        f"<description>{escape(feed['title'])}</description>",
+        f"<atom:link href={quoteattr(feed['url'])} rel=\"self\" type=\"{FORMATS['rss']}\"/>",
+        f"<lastBuildDate>{format_datetime(feed['updated'], usegmt=True)}</lastBuildDate>",
+    ]
+    for item in items:
+        parts.append(
+            "<item>"
+            f"<title>{escape(item['title'])}</title>"
+            f"<link>{escape(item['url'])}</link>"
+            f"<guid isPermaLink=\"true\">{escape(item['url'])}</guid>"
+            f"<pubDate>{format_datetime(item['published'], usegmt=True)}</pubDate>"
+            f"<description>{escape(item['content'])}</description>"
+            + "".join(f"<category>{escape(name)}</category>" for name in item["categories"])
+            + "</item>"
+        )
+    parts.append("</channel></rss>\n")
+    return "".join(parts)
+
+
+def render_atom(feed, items):
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>\n',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"<title>{escape(feed['title'])}</title>",
+        f"<id>{escape(feed['url'])}</id>",
+        f"<link href={quoteattr(SITE_URL)}/>",
+        f"<link href={quoteattr(feed['url'])} rel=\"self\"/>",
+        f"<updated>{feed['updated'].isoformat()}</updated>",
+    ]
+    for item in items:
+        parts.append(
+            "<entry>"
+            f"<title>{escape(item['title'])}</title>"
+            f"<id>{escape(item['url'])}</id>"
+            f"<link href={quoteattr(item['url'])}/>"
+            f"<published>{item['published'].isoformat()}</published>"
+            f"<updated>{item['updated'].isoformat()}</updated>"
+            f"<author><name>{escape(item['author'])}</name></author>"
+            + (f"<summary>{escape(item['summary'])}</summary>" if item["summary"] else "")
+            + f"<content type=\"html\">{escape(item['content'])}</content>"
+            + "".join(f"<category term={quoteattr(name)}/>" for name in item["categories"])
+            + "</entry>"
+        )
+    parts.append("</feed>\n")
+    return "".join(parts)
+
+
+def render_json(feed, items):
+    document = {
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": feed["title"],
+        "home_page_url": SITE_URL,
+        "feed_url": feed["url"],
+        "items": [
+            {
+                "id": item["url"],
+                "url": item["url"],
+                "title": item["title"],
+                "content_html": item["content"],
+                **({"summary": item["summary"]} if item["summary"] else {}),
+                "date_published": item["published"].isoformat(),
+                "date_modified": item["updated"].isoformat(),
+                "authors": [{"name": item["author"]}],
+                "tags": item["categories"],
+            }
+            for item in items
+        ],
+    }
+    return json.dumps(document, ensure_ascii=False) + "\n"
+
+
+RENDERERS = {"rss": render_rss, "atom": render_atom, "json": render_json}
+
+
+def post_feed_scopes(cursor, post_ids):
+    """Return the scopes of the feeds that list any of ``post_ids``: the
+    site feed and the feeds of their categories and tags.
+
+    ``cursor`` must return tuples.
+    """
+    scopes = {SITE_SCOPE}
+    if not post_ids:
+        return scopes
+    placeholders = ", ".join(["%s"] * len(post_ids))
+    cursor.execute(" UNION ".join(
+        f"SELECT '{kind}', t.slug FROM {link_table} l JOIN {table} t ON t.id = l.{column}"
+        f" WHERE l.post_id IN ({placeholders})"
+        for kind, (table, link_table, column) in SCOPE_TABLES.items()
+    ), list(post_ids) * len(SCOPE_TABLES))
+    scopes.update(f"{kind}:{slug}" for kind, slug in cursor.fetchall())
+    return scopes
+
+
+def invalidate_feeds(cursor, scopes):
+    """Mark the feeds of ``scopes`` for rendering, inside the caller's transaction."""
+    scopes = sorted(scopes)
+    if not scopes:
+        return
+    # Rows are created even for feeds never requested, so a rendering that
+    # started before this write finds its version outdated
+    cursor.execute(
+        "INSERT IGNORE INTO feeds (scope, format) VALUES "
+        + ", ".join(["(%s, %s)"] * (len(scopes) * len(FORMATS))),
+        [value for scope in scopes for fmt in FORMATS for value in (scope, fmt)]
+    )
+    # A feed's Last-Modified is the time of its last change, so it moves
+    # forward even when the change removes its newest post
+    cursor.execute(
+        "UPDATE feeds SET version = version + 1, body = NULL, last_modified = NOW(6)"
+        f" WHERE scope IN ({', '.join(['%s'] * len(scopes))})",
+        scopes
+    )
+
+
+def load_feed(conn, scope, fmt):
+    """Return ``(body, digest, last_modified)`` of a rendered feed, or None
+    if it hasn't been rendered since the last change."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT body, digest, last_modified FROM feeds WHERE scope = %s AND format = %s",
+            (scope, fmt)
+        )
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if row is None or row[0] is None:
+        return None
+    return bytes(row[0]), row[1], row[2]
+
+
+def _feed_title(cursor, scope):
+    """Return the title of the feed of ``scope``, or None if its term doesn't exist."""
+    if scope == SITE_SCOPE:
+        return SITE_TITLE
+    kind, _, slug = scope.partition(":")
+    cursor.execute(f"SELECT name FROM {SCOPE_TABLES[kind][0]} WHERE slug = %s", (slug,))
+    row = cursor.fetchone()
+    return f"{SITE_TITLE}: {row[0]}" if row else None
+
+
+def _feed_items(cursor, scope):
+    query = """
+    SELECT p.id, p.title, p.excerpt, p.content, p.created_at, p.updated_at, p.published_at, u.name
+    FROM posts p
+    JOIN users u ON p.author_id = u.id
+    """
+    params = []
+    if scope != SITE_SCOPE:
+        kind, _, slug = scope.partition(":")
+        table, link_table, column = SCOPE_TABLES[kind]
+        query += f"""
+        JOIN {link_table} l ON l.post_id = p.id
+        JOIN {table} t ON t.id = l.{column} AND t.slug = %s
+        """
+        params.append(slug)
+    query += " WHERE p.status = 'published' ORDER BY p.created_at DESC, p.id DESC LIMIT %s"
+    params.append(FEED_SIZE)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+
+    names = {row[0]: [] for row in rows}
+    if rows:
+        placeholders = ", ".join(["%s"] * len(rows))
+        cursor.execute(" UNION ALL ".join(
+            f"SELECT l.post_id, t.name FROM {link_table} l JOIN {table} t ON t.id = l.{column}"
+            f" WHERE l.post_id IN ({placeholders})"
+            for table, link_table, column in SCOPE_TABLES.values()
+        ), list(names) * len(SCOPE_TABLES))
+        for post_id, name in cursor.fetchall():
+            names[post_id].append(name)
+
+    return [
+        {
+            "url": post_url(post_id),
+            "title": title,
+            "summary": excerpt,
+            "content": content,
+            "published": _utc(published_at or created_at),
+            "updated": _utc(updated_at or created_at),
+            "author": author,
+            "categories": names[post_id],
+        }
+        for post_id, title, excerpt, content, created_at, updated_at, published_at, author in rows
+    ]
+
+
+def render_feeds(conn, scope, feed_path):
+    """Render every format of the feed of ``scope`` and store the ones still current.
+
+    ``feed_path`` maps a format to the feed's URL path. Returns a mapping
+    of format to ``(body, digest, last_modified)``, or None if the scope's
+    category or tag doesn't exist.
+    """
+    cursor = conn.cursor()
+    try:
+        # Unknown terms are turned away with a plain read, before the write
+        # transaction takes its locks
+        title = _feed_title(cursor, scope)
+        conn.rollback()
+        if title is None:
+            return None
+
+        conn.start_transaction()
+        cursor.execute("SELECT format, version, last_modified FROM feeds WHERE scope = %s", (scope,))
+        stored = {fmt: (version, modified) for fmt, version, modified in cursor.fetchall()}
+        items = _feed_items(cursor, scope)
+        now = datetime.now(timezone.utc)
+        updated = max((item["updated"] for item in items), default=now)
+
+        rendered = {}
+        for fmt, render in RENDERERS.items():
+            feed = {"title": title, "url": SITE_URL + feed_path[fmt], "updated": updated}
+            document = render(feed, items).encode()
+            body = gzip.compress(document, compresslevel=GZIP_LEVEL, mtime=0)
+            digest = hashlib.sha256(document).hexdigest()[:32]
+            version, last_modified = stored.get(fmt, (None, None))
+            # Feeds never changed since their row was created date from
+            # their first rendering
+            last_modified = last_modified or now.replace(tzinfo=None)
+            rendered[fmt] = (body, digest, last_modified)
+            if version is not None:
+                cursor.execute("""
+                UPDATE feeds SET body = %s, digest = %s, last_modified = %s
+                WHERE scope = %s AND format = %s AND version = %s
+                """, (body, digest, last_modified, scope, fmt, version))
+            else:
+                cursor.execute("""
+                INSERT IGNORE INTO feeds (scope, format, body, digest, last_modified)
+                VALUES (%s, %s, %s, %s, %s)
+                """, (scope, fmt, body, digest, last_modified))
+        conn.commit()
+        return rendered
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
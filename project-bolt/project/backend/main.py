@@ -1,15 +1,35 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Request
+from fastapi import FastAPI, HTTPException, status, Request, Response, Query, Path
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import List, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import List, Optional, Union
 from pydantic import BaseModel
-from datetime import datetime
+from starlette.background import BackgroundTask
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 import mysql.connector
-import os
+import orjson
+import asyncio
+import base64
+import gzip
 import json
-import time
 import uvicorn
 
+from db import (
+    DB_ENGINE, PoolTimeout, ReadYourWritesMiddleware, executor_stats, iterate_db, pool,
+    replica_may_lag, replica_pools, run_db, run_read, shutdown_executor,
+)
+from autosave import autosave_coalescer, content_hash, taxonomy_hash
+from cache import response_cache, taxonomy_cache
+from compression import COMPRESSION_MIN_BYTES, CompressionMiddleware, accepts, choose_encoding, compress
+from feeds import FORMATS as FEED_FORMATS, SITE_SCOPE, invalidate_feeds, load_feed, post_feed_scopes, render_feeds
+from metrics import MetricsMiddleware, render as render_metrics
+from migrations import check_schema
+from revisions import list_revisions, load_revision, record_revision
+from search import fts_query, highlight, plain_text, query_terms
+from taxonomy import TAXONOMY_LINKS, resolve_terms
+from text_analysis import analysis_cache, analyze
+from transfer import IMPORT_BATCH_SIZE, export_posts, import_lines
+
 app = FastAPI(title="Blog API")
 
 # Configure CORS
@@ -25,15 +45,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Next-Cursor", "X-Next-Offset"],
 )
 
-# Database configuration
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST", "localhost"),
-    "user": os.getenv("DB_USER", "root"),
-    "password": os.getenv("DB_PASSWORD", "password"),
-    "database": os.getenv("DB_NAME", "blog_db"),
-}
+# Reads of a client that just wrote stay on the primary (no-op without
+# DB_REPLICAS)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# gzip/brotli for clients that accept it; added before the metrics
+# middleware so response sizes are measured as sent
+app.add_middleware(CompressionMiddleware)
+
+# Per-route latency, response size and query metrics, served on /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Models
 class CategoryBase(BaseModel):
@@ -61,7 +85,8 @@ class TagCreate(TagBase):
 class Author(BaseModel):
     id: int
     name: str
-    avatar: str
+    # users.avatar is nullable
+    avatar: Optional[str] = None
     
 class PostBase(BaseModel):
     title: str
@@ -78,6 +103,29 @@ class PostCreate(PostBase):
 class PostUpdate(PostBase):
     pass
 
+class RevisionSummary(BaseModel):
+    revision: int
+    kind: str
+    title: str
+    content_length: int
+    stored_bytes: int
+    created_at: datetime
+
+class Revision(BaseModel):
+    revision: int
+    title: str
+    content: str
+    excerpt: Optional[str] = None
+    featured_image: Optional[str] = None
+    categories: List[str]
+    tags: List[str]
+    created_at: datetime
+
+class DraftAutosave(PostBase):
+    """An autosave payload; ``id`` identifies the draft once it exists."""
+    id: Optional[int] = None
+    status: str = "draft"
+
 class Post(PostBase):
     id: int
     author: Author
@@ -86,156 +134,269 @@ class Post(PostBase):
     published_at: Optional[datetime] = None
     reading_time: int
 
-# Database connection
-def get_db():
-    conn = mysql.connector.connect(**DB_CONFIG)
+class PostSummary(BaseModel):
+    """A post without its content body, for list views."""
+    id: int
+    title: str
+    excerpt: Optional[str] = None
+    featured_image: Optional[str] = None
+    status: str
+    categories: List[str]
+    tags: List[str]
+    author: Author
+    created_at: datetime
+    updated_at: datetime
+    published_at: Optional[datetime] = None
+    reading_time: int
+
+class SearchResult(PostSummary):
+    score: float
+    highlight: str
+
+# Columns selected for posts; summary views leave out the content TEXT column
+POST_SUMMARY_COLUMNS = """p.id, p.title, p.excerpt, p.featured_image, p.status, p.reading_time,
+    p.created_at, p.updated_at, p.published_at,
+    u.id as author_id, u.name as author_name, u.avatar as author_avatar"""
+POST_COLUMNS = "p.content, " + POST_SUMMARY_COLUMNS
+
+# Pagination
+# List endpoints page with an opaque keyset cursor over (sort timestamp, id),
+# so fetching a deep page costs the same index range scan as the first one.
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def _encode_cursor(sort_value: datetime, post_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat(), post_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
     try:
-        yield conn
-    finally:
-        conn.close()
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, post_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), int(post_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-# Create tables if they don't exist
-def create_tables():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
+def _page_params(limit: Optional[int], cursor: Optional[str]):
+    """Resolve the limit and decoded keyset position for a list request."""
+    if cursor is None:
+        return limit, None
+    return limit or DEFAULT_PAGE_SIZE, _decode_cursor(cursor)
+
+def _keyset_condition(sort_column: str, after: tuple):
+    """Return the predicate and params selecting rows after a keyset position.
     
-    try:
-        # Create users table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            email VARCHAR(255) NOT NULL UNIQUE,
-            password VARCHAR(255) NOT NULL,
-            avatar VARCHAR(255),
-            role VARCHAR(50) DEFAULT 'user',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Create categories table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS categories (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            slug VARCHAR(255) NOT NULL UNIQUE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Create tags table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tags (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            slug VARCHAR(255) NOT NULL UNIQUE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Create posts table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS posts (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            title VARCHAR(255) NOT NULL,
-            content TEXT NOT NULL,
-            excerpt TEXT,
-            featured_image VARCHAR(255),
-            status VARCHAR(20) NOT NULL DEFAULT 'draft',
-            author_id INT NOT NULL,
-            reading_time INT DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            published_at TIMESTAMP NULL,
-            FOREIGN KEY (author_id) REFERENCES users(id)
-        )
-        """)
-        
-        # Create post_categories table (many-to-many)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS post_categories (
-            post_id INT NOT NULL,
-            category_id INT NOT NULL,
-            PRIMARY KEY (post_id, category_id),
-            FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
-            FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE
-        )
-        """)
-        
-        # Create post_tags table (many-to-many)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS post_tags (
-            post_id INT NOT NULL,
-            tag_id INT NOT NULL,
-            PRIMARY KEY (post_id, tag_id),
-            FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
-            FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
-        )
-        """)
-        
-        conn.commit()
-        print("Database tables created successfully")
-        
-    except Exception as e:
-        print(f"Error creating tables: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+    Written as an OR rather than a row constructor: MySQL only uses the
+    leading column of an index for ``(a, b) < (x, y)`` when the index
+    doesn't start with ``a``, so behind an equality prefix like ``status``
+    a row constructor would scan every newer row.
+    """
+    sort_value, post_id = after
+    return (
+        f"(p.{sort_column} < %s OR (p.{sort_column} = %s AND p.id < %s))",
+        [sort_value, sort_value, post_id]
+    )
+
+def _paginate(rows: list, limit: Optional[int], sort_column: str):
+    """Trim a LIMIT n + 1 result to n rows and build the cursor for the next page."""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, _encode_cursor(rows[-1][sort_column], rows[-1]["id"])
+
+# Response encoding
+# Read endpoints build their rows in the shape of their response_model and
+# return them through _json_response, which encodes with orjson and skips
+# FastAPI's validation and jsonable_encoder pass over every row.
+# benchmarks/serialization.py checks the output against the Pydantic models.
+def _json_body(content) -> bytes:
+    # UTC datetimes end in "Z", as Pydantic writes them
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+def _json_response(content, response: Optional[Response] = None, encoded: bool = False) -> Response:
+    """Return ``content`` (or an already ``encoded`` body) as a JSON response,
+    keeping any headers set on the handler's injected ``response``."""
+    fast = Response(content if encoded else _json_body(content), media_type="application/json")
+    if response is not None:
+        fast.headers.update(response.headers)
+    return fast
+
+# Conditional requests
+# List validators come from the data_versions table, which every write bumps
+# in its own transaction; single posts are validated by their updated_at.
+# Checking either costs one primary-key lookup, well before the full result
+# is loaded or rendered.
+def _etag(*parts) -> str:
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+def _strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = _strip_weak(etag)
+    return any(_strip_weak(tag.strip()) == opaque for tag in if_none_match.split(","))
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def _validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
 
-# Initialize database
+def _conditional_response(request: Request, response: Response, etag: str, last_modified: Optional[datetime] = None):
+    """Return a 304 if the client's copy is current, else set validators on ``response``."""
+    headers = _validator_headers(etag, last_modified)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def _data_version(db: mysql.connector.connection.MySQLConnection, name: str) -> int:
+    cursor = db.cursor()
+    cursor.execute("SELECT version FROM data_versions WHERE name = %s", (name,))
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else 0
+
+def _bump_versions(cursor, *names: str):
+    """Advance the result-set versions touched by a write, inside its transaction."""
+    cursor.execute(
+        f"UPDATE data_versions SET version = version + 1 WHERE name IN ({', '.join(['%s'] * len(names))})",
+        names
+    )
+
+def _read_if_changed(
+    db: mysql.connector.connection.MySQLConnection,
+    version_name: str,
+    if_none_match: Optional[str],
+    load,
+    *args
+):
+    """Run ``load`` only if the client's ETag for ``version_name`` is stale.
+    
+    Returns ``(etag, result)``, with ``result`` None when nothing changed. The
+    version and the data are read in the same transaction snapshot.
+    """
+    etag = _etag(version_name, _data_version(db, version_name))
+    if _etag_matches(if_none_match, etag):
+        return etag, None
+    return etag, load(db, *args)
+
+# Database access
+# Route handlers stay on the event loop and hand their queries to the bounded
+# executor in db.run_db, which checks a pooled connection out for the call.
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+# Check the schema; creating and migrating it is `python manage.py migrate`'s
+# job, run once per deploy rather than by every worker
 @app.on_event("startup")
 async def startup_db_client():
-    try:
-        # Check if database exists, if not create it
-        conn = mysql.connector.connect(
-            host=DB_CONFIG["host"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"]
-        )
-        cursor = conn.cursor()
-        
-        # Create database if it doesn't exist
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}")
-        cursor.close()
-        conn.close()
-        
-        # Create tables
-        create_tables()
-        
-    except Exception as e:
-        print(f"Database initialization error: {e}")
+    await run_db(check_schema)
+
+@app.on_event("shutdown")
+async def shutdown_db_client():
+    shutdown_executor()
+    pool.close()
+    for replica_pool in replica_pools:
+        replica_pool.close()
 
 # Routes
 @app.get("/")
 async def root():
     return {"message": "Blog API"}
 
+@app.get("/api/stats")
+async def get_stats():
+    return {
+        "pool": pool.stats(),
+        "replica_pools": [replica_pool.stats() for replica_pool in replica_pools],
+        "executor": executor_stats(),
+        "taxonomy_cache": taxonomy_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "autosave": autosave_coalescer.stats(),
+        "text_analysis": analysis_cache.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    pool_stats = pool.stats()
+    executor = executor_stats()
+    return PlainTextResponse(
+        render_metrics([
+            ("db_pool_connections_open", "Connections open in the pool", pool_stats["open"]),
+            ("db_pool_connections_in_use", "Connections checked out of the pool", pool_stats["in_use"]),
+            ("db_pool_timeouts", "Checkouts that timed out waiting for a connection", pool_stats["timeouts"]),
+            ("db_executor_running", "Database calls running on the executor", executor["running"]),
+            ("db_executor_queued", "Database calls waiting for an executor thread", executor["queued"]),
+        ]),
+        media_type="text/plain; version=0.0.4"
+    )
+
 # Categories
-@app.get("/api/categories", response_model=List[Category])
-async def get_categories(db: mysql.connector.connection.MySQLConnection = Depends(get_db)):
+async def _cached_taxonomy(request: Request, response: Response, key: str, load):
+    """Serve a category/tag listing from the taxonomy cache, loading it on a miss.
+    
+    The encoded listing is cached together with its ETag, so neither
+    revalidating nor serving a cached listing touches the database or
+    re-encodes it.
+    """
+    cached = taxonomy_cache.get(key)
+    if cached is None:
+        generation = taxonomy_cache.generation
+        etag, items = await run_read(_read_if_changed, "taxonomy", None, load)
+        cached = (etag, _json_body(items))
+        # Don't cache a listing from a replica that may predate this
+        # worker's last taxonomy write
+        if not replica_may_lag(taxonomy_cache.invalidated_at):
+            taxonomy_cache.set(key, cached, generation)
+    
+    etag, body = cached
+    not_modified = _conditional_response(request, response, etag)
+    return not_modified or _json_response(body, response, encoded=True)
+
+def _get_categories(db: mysql.connector.connection.MySQLConnection):
     cursor = db.cursor(dictionary=True)
     cursor.execute("""
-    SELECT c.id, c.name, c.slug, COUNT(pc.post_id) as count
-    FROM categories c
-    LEFT JOIN post_categories pc ON c.id = pc.category_id
-    GROUP BY c.id
-    ORDER BY c.name
+    SELECT id, name, slug, post_count as count
+    FROM categories
+    ORDER BY name
     """)
     categories = cursor.fetchall()
     cursor.close()
     return categories
 
-@app.post("/api/categories", response_model=Category, status_code=status.HTTP_201_CREATED)
-async def create_category(category: CategoryCreate, db: mysql.connector.connection.MySQLConnection = Depends(get_db)):
+@app.get("/api/categories", response_model=List[Category])
+async def get_categories(request: Request, response: Response):
+    return await _cached_taxonomy(request, response, "categories", _get_categories)
+
+def _create_category(db: mysql.connector.connection.MySQLConnection, category: CategoryCreate):
     cursor = db.cursor()
     try:
         cursor.execute(
             "INSERT INTO categories (name, slug) VALUES (%s, %s)",
             (category.name, category.slug)
         )
+        _bump_versions(cursor, "taxonomy")
         db.commit()
         category_id = cursor.lastrowid
         
@@ -260,29 +421,36 @@ async def create_category(category: CategoryCreate, db: mysql.connector.connecti
     finally:
         cursor.close()
 
+@app.post("/api/categories", response_model=Category, status_code=status.HTTP_201_CREATED)
+async def create_category(category: CategoryCreate):
+    created = await run_db(_create_category, category)
+    taxonomy_cache.invalidate("categories")
+    return created
+
 # Tags
-@app.get("/api/tags", response_model=List[Tag])
-async def get_tags(db: mysql.connector.connection.MySQLConnection = Depends(get_db)):
+def _get_tags(db: mysql.connector.connection.MySQLConnection):
     cursor = db.cursor(dictionary=True)
     cursor.execute("""
-    SELECT t.id, t.name, t.slug, COUNT(pt.post_id) as count
-    FROM tags t
-    LEFT JOIN post_tags pt ON t.id = pt.tag_id
-    GROUP BY t.id
-    ORDER BY t.name
+    SELECT id, name, slug, post_count as count
+    FROM tags
+    ORDER BY name
     """)
     tags = cursor.fetchall()
     cursor.close()
     return tags
 
-@app.post("/api/tags", response_model=Tag, status_code=status.HTTP_201_CREATED)
-async def create_tag(tag: TagCreate, db: mysql.connector.connection.MySQLConnection = Depends(get_db)):
+@app.get("/api/tags", response_model=List[Tag])
+async def get_tags(request: Request, response: Response):
+    return await _cached_taxonomy(request, response, "tags", _get_tags)
+
+def _create_tag(db: mysql.connector.connection.MySQLConnection, tag: TagCreate):
     cursor = db.cursor()
     try:
         cursor.execute(
             "INSERT INTO tags (name, slug) VALUES (%s, %s)",
             (tag.name, tag.slug)
         )
+        _bump_versions(cursor, "taxonomy")
         db.commit()
         tag_id = cursor.lastrowid
         
@@ -307,18 +475,147 @@ async def create_tag(tag: TagCreate, db: mysql.connector.connection.MySQLConnect
     finally:
         cursor.close()
 
+@app.post("/api/tags", response_model=Tag, status_code=status.HTTP_201_CREATED)
+async def create_tag(tag: TagCreate):
+    created = await run_db(_create_tag, tag)
+    taxonomy_cache.invalidate("tags")
+    return created
+
+# Taxonomy writes
+def _sync_terms(cursor, post_id: int, table: str, names: List[str], new_post: bool = False):
+    """Make a post's links into ``table`` match ``names``.
+    
+    Only links that actually changed are deleted or inserted, and the
+    materialized ``post_count`` of each affected term is adjusted to match.
+    """
+    link_table, column = TAXONOMY_LINKS[table]
+    wanted = set(resolve_terms(cursor, table, names).values())
+    current = set()
+    if not new_post:
+        cursor.execute(f"SELECT {column} FROM {link_table} WHERE post_id = %s", (post_id,))
+        current = {row[0] for row in cursor.fetchall()}
+    
+    removed = list(current - wanted)
+    if removed:
+        placeholders = ", ".join(["%s"] * len(removed))
+        cursor.execute(
+            f"DELETE FROM {link_table} WHERE post_id = %s AND {column} IN ({placeholders})",
+            [post_id] + removed
+        )
+        cursor.execute(
+            f"UPDATE {table} SET post_count = post_count - 1 WHERE id IN ({placeholders})",
+            removed
+        )
+    
+    added = list(wanted - current)
+    if added:
+        cursor.executemany(
+            f"INSERT INTO {link_table} (post_id, {column}) VALUES (%s, %s)",
+            [(post_id, term_id) for term_id in added]
+        )
+        cursor.execute(
+            f"UPDATE {table} SET post_count = post_count + 1 WHERE id IN ({', '.join(['%s'] * len(added))})",
+            added
+        )
+    
+    return bool(removed or added)
+
+def _sync_post_taxonomy(cursor, post_id: int, categories: List[str], tags: List[str], new_post: bool = False):
+    """Link a post to the named categories and tags, creating missing ones.
+    
+    Bumps the posts result-set version, and the taxonomy version too when
+    any link (and with it a post count) changed.
+    """
+    changed = _sync_terms(cursor, post_id, "categories", categories, new_post)
+    changed = _sync_terms(cursor, post_id, "tags", tags, new_post) or changed
+    _bump_versions(cursor, *(("posts", "taxonomy") if changed else ("posts",)))
+
+def _unlink_post_taxonomy(cursor, post_id: int):
+    """Drop a post's taxonomy links, decrementing the counts they contributed."""
+    for table, (link_table, column) in TAXONOMY_LINKS.items():
+        cursor.execute(f"""
+        UPDATE {table} SET post_count = post_count - 1
+        WHERE id IN (SELECT {column} FROM {link_table} WHERE post_id = %s)
+        """, (post_id,))
+        cursor.execute(f"DELETE FROM {link_table} WHERE post_id = %s", (post_id,))
+
 # Posts
-@app.get("/api/posts", response_model=List[Post])
-async def get_posts(
-    status: Optional[str] = None,
-    category: Optional[str] = None,
-    tag: Optional[str] = None,
-    db: mysql.connector.connection.MySQLConnection = Depends(get_db)
-):
-    cursor = db.cursor(dictionary=True)
+def _fetch_post_taxonomy(db: mysql.connector.connection.MySQLConnection, post_ids: List[int]):
+    """Return category and tag names keyed by post id, in two queries total."""
+    categories = {post_id: [] for post_id in post_ids}
+    tags = {post_id: [] for post_id in post_ids}
+    if not post_ids:
+        return categories, tags
+    
+    placeholders = ", ".join(["%s"] * len(post_ids))
+    cursor = db.cursor()
+    
+    cursor.execute(f"""
+    SELECT pc.post_id, c.name FROM categories c
+    JOIN post_categories pc ON c.id = pc.category_id
+    WHERE pc.post_id IN ({placeholders})
+    """, post_ids)
+    for post_id, name in cursor.fetchall():
+        categories[post_id].append(name)
+    
+    cursor.execute(f"""
+    SELECT pt.post_id, t.name FROM tags t
+    JOIN post_tags pt ON t.id = pt.tag_id
+    WHERE pt.post_id IN ({placeholders})
+    """, post_ids)
+    for post_id, name in cursor.fetchall():
+        tags[post_id].append(name)
     
-    query = """
-    SELECT p.*, u.id as author_id, u.name as author_name, u.avatar as author_avatar
+    cursor.close()
+    return categories, tags
+
+def _post_from_row(post: dict, categories: List[str], tags: List[str]):
+    data = {
+        "id": post["id"],
+        "title": post["title"],
+        "excerpt": post["excerpt"],
+        "featured_image": post["featured_image"],
+        "status": post["status"],
+        "author": {
+            "id": post["author_id"],
+            "name": post["author_name"],
+            "avatar": post["author_avatar"]
+        },
+        "categories": categories,
+        "tags": tags,
+        "created_at": post["created_at"],
+        "updated_at": post["updated_at"],
+        "published_at": post["published_at"],
+        "reading_time": post["reading_time"]
+    }
+    if "content" in post:
+        data["content"] = post["content"]
+    return data
+
+def _saved_post(db: mysql.connector.connection.MySQLConnection, post_id: int, categories: List[str], tags: List[str]):
+    """Read back a post just written, with its stored timestamps and author."""
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(f"""
+    SELECT {POST_COLUMNS}
+    FROM posts p
+    JOIN users u ON p.author_id = u.id
+    WHERE p.id = %s
+    """, (post_id,))
+    post = cursor.fetchone()
+    cursor.close()
+    return _post_from_row(post, categories, tags)
+
+def _posts_query(
+    status: Optional[str],
+    category: Optional[str],
+    tag: Optional[str],
+    limit: Optional[int] = None,
+    after: Optional[tuple] = None,
+    summary: bool = False
+):
+    """Return the SQL and params listing posts for ``GET /api/posts``."""
+    query = f"""
+    SELECT {POST_SUMMARY_COLUMNS if summary else POST_COLUMNS}
     FROM posts p
     JOIN users u ON p.author_id = u.id
     """
@@ -340,67 +637,191 @@ async def get_posts(
         conditions.append("t.slug = %s")
         params.append(tag)
     
+    if after:
+        condition, after_params = _keyset_condition("created_at", after)
+        conditions.append(condition)
+        params.extend(after_params)
+    
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
     
-    query += " ORDER BY p.created_at DESC"
+    query += " ORDER BY p.created_at DESC, p.id DESC"
+    
+    if limit is not None:
+        # One extra row tells us whether there is a next page
+        query += " LIMIT %s"
+        params.append(limit + 1)
     
+    return query, params
+
+def _get_posts(
+    db: mysql.connector.connection.MySQLConnection,
+    status: Optional[str],
+    category: Optional[str],
+    tag: Optional[str],
+    limit: Optional[int] = None,
+    after: Optional[tuple] = None,
+    summary: bool = False
+):
+    cursor = db.cursor(dictionary=True)
+    query, params = _posts_query(status, category, tag, limit, after, summary)
     cursor.execute(query, params)
-    posts_data = cursor.fetchall()
+    posts_data, next_cursor = _paginate(cursor.fetchall(), limit, "created_at")
     
-    # Process posts to include categories and tags
-    posts = []
-    for post in posts_data:
-        # Get categories for this post
-        cursor.execute("""
-        SELECT c.name FROM categories c
-        JOIN post_categories pc ON c.id = pc.category_id
-        WHERE pc.post_id = %s
-        """, (post["id"],))
-        categories = [row[0] for row in cursor.fetchall()]
-        
-        # Get tags for this post
-        cursor.execute("""
-        SELECT t.name FROM tags t
-        JOIN post_tags pt ON t.id = pt.tag_id
-        WHERE pt.post_id = %s
-        """, (post["id"],))
-        tags = [row[0] for row in cursor.fetchall()]
-        
-        # Create author object
-        author = {
-            "id": post["author_id"],
-            "name": post["author_name"],
-            "avatar": post["author_avatar"]
-        }
-        
-        # Add to posts list
-        posts.append({
-            "id": post["id"],
-            "title": post["title"],
-            "content": post["content"],
-            "excerpt": post["excerpt"],
-            "featured_image": post["featured_image"],
-            "status": post["status"],
-            "author": author,
-            "categories": categories,
-            "tags": tags,
-            "created_at": post["created_at"],
-            "updated_at": post["updated_at"],
-            "published_at": post["published_at"],
-            "reading_time": post["reading_time"]
-        })
+    # Fetch categories and tags for the whole result set in two queries
+    categories, tags = _fetch_post_taxonomy(db, [post["id"] for post in posts_data])
+    posts = [
+        _post_from_row(post, categories[post["id"]], tags[post["id"]])
+        for post in posts_data
+    ]
     
     cursor.close()
-    return posts
+    return posts, next_cursor
 
-@app.get("/api/posts/{post_id}", response_model=Post)
-async def get_post(post_id: int, db: mysql.connector.connection.MySQLConnection = Depends(get_db)):
+@app.get("/api/posts", response_model=Union[List[Post], List[PostSummary]])
+async def get_posts(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$")
+):
+    limit, after = _page_params(limit, cursor)
+    etag, result = await run_read(
+        _read_if_changed, "posts", request.headers.get("if-none-match"),
+        _get_posts, status, category, tag, limit, after, view == "summary"
+    )
+    not_modified = _conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    posts, next_cursor = result
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return _json_response(posts, response)
+
+# Search
+# Ranked by the posts FULLTEXT index (migration 3); MATCH ... AGAINST runs
+# in natural language mode, so the usual InnoDB stopwords and minimum token
+# length apply. On SQLite the posts_fts table is matched for any query word
+# and ranked by bm25.
+def _search_posts(
+    db: mysql.connector.connection.MySQLConnection,
+    q: str,
+    status: Optional[str],
+    limit: int,
+    offset: int
+):
+    if DB_ENGINE == "sqlite":
+        match = fts_query(q)
+        if not match:
+            return [], None
+        query = f"""
+        SELECT {POST_SUMMARY_COLUMNS}, p.content, -bm25(posts_fts) AS score
+        FROM posts_fts
+        JOIN posts p ON p.id = posts_fts.rowid
+        JOIN users u ON p.author_id = u.id
+        WHERE posts_fts MATCH %s
+        """
+        params = [match]
+    else:
+        query = f"""
+        SELECT {POST_SUMMARY_COLUMNS}, p.content,
+            MATCH(p.title, p.excerpt, p.content) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+        FROM posts p
+        JOIN users u ON p.author_id = u.id
+        WHERE MATCH(p.title, p.excerpt, p.content) AGAINST (%s IN NATURAL LANGUAGE MODE)
+        """
+        params = [q, q]
+    
+    if status:
+        query += " AND p.status = %s"
+        params.append(status)
+    
+    query += " ORDER BY score DESC, p.id DESC LIMIT %s OFFSET %s"
+    params.extend([limit + 1, offset])
+    
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    terms = query_terms(q)
+    categories, tags = _fetch_post_taxonomy(db, [row["id"] for row in rows])
+    results = []
+    for row in rows:
+        content = row.pop("content")
+        result = _post_from_row(row, categories[row["id"]], tags[row["id"]])
+        result["score"] = float(row["score"])
+        result["highlight"] = highlight(plain_text(content), terms) or highlight(row["title"], terms)
+        results.append(result)
+    
+    return results, offset + limit if has_more else None
+
+@app.get("/api/posts/search", response_model=List[SearchResult])
+async def search_posts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0)
+):
+    results, next_offset = await run_read(_search_posts, q, status, limit, offset)
+    if next_offset is not None:
+        response.headers["X-Next-Offset"] = str(next_offset)
+    return _json_response(results, response)
+
+def _get_post_version(db: mysql.connector.connection.MySQLConnection, post_id: int):
+    cursor = db.cursor()
+    cursor.execute("SELECT updated_at FROM posts WHERE id = %s", (post_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    if not row:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return row[0]
+
+def _get_post_body(db: mysql.connector.connection.MySQLConnection, post_id: int, request: Request):
+    """Return ``(updated_at, body, encoding)`` for a post's rendered JSON.
+    
+    ``body`` is None if the client's copy is current. Rendered posts are
+    cached under their (id, updated_at) version, so a hit costs only the
+    version lookup. Each content encoding a client asked for is cached
+    next to the plain rendering, so a post is compressed once per version
+    rather than on every hit.
+    """
+    updated_at = _get_post_version(db, post_id)
+    if _not_modified(request, _post_etag(post_id, updated_at), _as_utc(updated_at)):
+        return updated_at, None, None
+    
+    key = _post_cache_key(post_id, updated_at)
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    if encoding:
+        body = response_cache.get(f"{key}.{encoding}")
+        if body is not None:
+            return updated_at, body, encoding
+    
+    body = response_cache.get(key)
+    if body is None:
+        body = _json_body(_get_post(db, post_id))
+        response_cache.set(key, body)
+    if encoding and len(body) >= COMPRESSION_MIN_BYTES:
+        body = compress(body, encoding)
+        response_cache.set(f"{key}.{encoding}", body)
+        return updated_at, body, encoding
+    return updated_at, body, None
+
+def _get_post(db: mysql.connector.connection.MySQLConnection, post_id: int):
     cursor = db.cursor(dictionary=True)
     
     # Get post data
-    cursor.execute("""
-    SELECT p.*, u.id as author_id, u.name as author_name, u.avatar as author_avatar
+    cursor.execute(f"""
+    SELECT {POST_COLUMNS}
     FROM posts p
     JOIN users u ON p.author_id = u.id
     WHERE p.id = %s
@@ -410,169 +831,78 @@ async def get_post(post_id: int, db: mysql.connector.connection.MySQLConnection
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    # Get categories for this post
-    cursor.execute("""
-    SELECT c.name FROM categories c
-    JOIN post_categories pc ON c.id = pc.category_id
-    WHERE pc.post_id = %s
-    """, (post_id,))
-    categories = [row[0] for row in cursor.fetchall()]
-    
-    # Get tags for this post
-    cursor.execute("""
-    SELECT t.name FROM tags t
-    JOIN post_tags pt ON t.id = pt.tag_id
-    WHERE pt.post_id = %s
-    """, (post_id,))
-    tags = [row[0] for row in cursor.fetchall()]
-    
-    # Create author object
-    author = {
-        "id": post["author_id"],
-        "name": post["author_name"],
-        "avatar": post["author_avatar"]
-    }
-    
-    # Create post object
-    post_data = {
-        "id": post["id"],
-        "title": post["title"],
-        "content": post["content"],
-        "excerpt": post["excerpt"],
-        "featured_image": post["featured_image"],
-        "status": post["status"],
-        "author": author,
-        "categories": categories,
-        "tags": tags,
-        "created_at": post["created_at"],
-        "updated_at": post["updated_at"],
-        "published_at": post["published_at"],
-        "reading_time": post["reading_time"]
-    }
-    
     cursor.close()
-    return post_data
+    
+    categories, tags = _fetch_post_taxonomy(db, [post_id])
+    return _post_from_row(post, categories[post_id], tags[post_id])
 
-@app.post("/api/posts", response_model=Post, status_code=status.HTTP_201_CREATED)
-async def create_post(
-    post: PostCreate,
-    db: mysql.connector.connection.MySQLConnection = Depends(get_db)
-):
+def _post_etag(post_id: int, updated_at: datetime) -> str:
+    return _etag("post", post_id, updated_at.strftime("%Y%m%d%H%M%S%f"))
+
+def _post_cache_key(post_id: int, updated_at: datetime) -> str:
+    return f"post:{post_id}:{updated_at.strftime('%Y%m%d%H%M%S%f')}"
+
+def _invalidate_post(post_id: int):
+    """Drop every cached rendering of a post."""
+    response_cache.invalidate_prefix(f"post:{post_id}:")
+
+def _as_utc(value: datetime) -> datetime:
+    # TIMESTAMP columns come back naive, in the session time zone (UTC)
+    return value.replace(tzinfo=timezone.utc)
+
+@app.get("/api/posts/{post_id}", response_model=Post)
+async def get_post(post_id: int, request: Request):
+    updated_at, body, encoding = await run_read(_get_post_body, post_id, request)
+    headers = _validator_headers(_post_etag(post_id, updated_at), _as_utc(updated_at))
+    headers["Vary"] = "Accept-Encoding"
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _create_post(db: mysql.connector.connection.MySQLConnection, post: PostCreate):
     cursor = db.cursor()
     
     try:
         # Start transaction
         db.start_transaction()
         
-        # Calculate reading time (simple estimate based on word count)
-        words = len(post.content.split())
-        reading_time = max(1, int(words / 200))  # Assuming 200 words per minute
+        # Reading time from the words of the rendered text; posts saved
+        # without an excerpt get one from the start of the text
+        text = analyze(post.content)
+        excerpt = post.excerpt or text.excerpt
         
         # Insert post
         cursor.execute("""
         INSERT INTO posts (
             title, content, excerpt, featured_image, status, 
-            author_id, reading_time, published_at
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            author_id, reading_time, published_at, content_hash, taxonomy_hash
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """, (
-            post.title, post.content, post.excerpt, post.featured_image,
+            post.title, post.content, excerpt, post.featured_image,
             post.status, 1,  # Hardcoded author_id for demo
-            reading_time,
-            datetime.now() if post.status == "published" else None
+            text.reading_time,
+            datetime.now(timezone.utc).replace(tzinfo=None) if post.status == "published" else None,
+            content_hash(post.title, post.content, post.excerpt, post.featured_image),
+            taxonomy_hash(post.categories, post.tags)
         ))
         
         post_id = cursor.lastrowid
         
-        # Process categories
-        for category_name in post.categories:
-            # Get or create category
-            cursor.execute(
-                "SELECT id FROM categories WHERE name = %s",
-                (category_name,)
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                category_id = result[0]
-            else:
-                # Create new category
-                slug = category_name.lower().replace(" ", "-")
-                cursor.execute(
-                    "INSERT INTO categories (name, slug) VALUES (%s, %s)",
-                    (category_name, slug)
-                )
-                category_id = cursor.lastrowid
-            
-            # Link post to category
-            cursor.execute(
-                "INSERT INTO post_categories (post_id, category_id) VALUES (%s, %s)",
-                (post_id, category_id)
-            )
-        
-        # Process tags
-        for tag_name in post.tags:
-            # Get or create tag
-            cursor.execute(
-                "SELECT id FROM tags WHERE name = %s",
-                (tag_name,)
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                tag_id = result[0]
-            else:
-                # Create new tag
-                slug = tag_name.lower().replace(" ", "-")
-                cursor.execute(
-                    "INSERT INTO tags (name, slug) VALUES (%s, %s)",
-                    (tag_name, slug)
-                )
-                tag_id = cursor.lastrowid
-            
-            # Link post to tag
-            cursor.execute(
-                "INSERT INTO post_tags (post_id, tag_id) VALUES (%s, %s)",
-                (post_id, tag_id)
-            )
+        # Link categories and tags, creating any that don't exist yet
+        _sync_post_taxonomy(cursor, post_id, post.categories, post.tags, new_post=True)
+        if post.status == "published":
+            invalidate_feeds(cursor, post_feed_scopes(cursor, [post_id]))
+        record_revision(
+            cursor, post_id, None, post.title, post.content, excerpt,
+            post.featured_image, post.categories, post.tags
+        )
         
         # Commit transaction
         db.commit()
         
-        # Retrieve the created post with author details
-        cursor.execute("""
-        SELECT p.*, u.id as author_id, u.name as author_name, u.avatar as author_avatar
-        FROM posts p
-        JOIN users u ON p.author_id = u.id
-        WHERE p.id = %s
-        """, (post_id,))
-        
-        post_data = cursor.fetchone()
-        
-        # Create author object
-        author = {
-            "id": post_data[10],  # author_id
-            "name": post_data[11],  # author_name
-            "avatar": post_data[12]  # author_avatar
-        }
-        
-        # Create the response
-        created_post = {
-            "id": post_id,
-            "title": post.title,
-            "content": post.content,
-            "excerpt": post.excerpt,
-            "featured_image": post.featured_image,
-            "status": post.status,
-            "author": author,
-            "categories": post.categories,
-            "tags": post.tags,
-            "created_at": datetime.now(),
-            "updated_at": datetime.now(),
-            "published_at": datetime.now() if post.status == "published" else None,
-            "reading_time": reading_time
-        }
-        
-        return created_post
+        return _saved_post(db, post_id, post.categories, post.tags)
         
     except Exception as e:
         db.rollback()
@@ -580,28 +910,33 @@ async def create_post(
     finally:
         cursor.close()
 
-@app.put("/api/posts/{post_id}", response_model=Post)
-async def update_post(
-    post_id: int,
-    post_update: PostUpdate,
-    db: mysql.connector.connection.MySQLConnection = Depends(get_db)
-):
+@app.post("/api/posts", response_model=Post, status_code=status.HTTP_201_CREATED)
+async def create_post(post: PostCreate):
+    created = await run_db(_create_post, post)
+    taxonomy_cache.invalidate()
+    return created
+
+def _update_post(db: mysql.connector.connection.MySQLConnection, post_id: int, post_update: PostUpdate):
     cursor = db.cursor()
     
     try:
-        # Check if post exists
-        cursor.execute("SELECT id FROM posts WHERE id = %s", (post_id,))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Post not found")
-        
         # Start transaction
         db.start_transaction()
         
-        # Calculate reading time
-        words = len(post_update.content.split())
-        reading_time = max(1, int(words / 200))
+        # Check if post exists, locking it so concurrent updates serialize
+        cursor.execute("SELECT content, status FROM posts WHERE id = %s FOR UPDATE", (post_id,))
+        existing = cursor.fetchone()
+        if not existing:
+            raise HTTPException(status_code=404, detail="Post not found")
+        
+        # Feeds listing the post before or after the update
+        feed_scopes = post_feed_scopes(cursor, [post_id]) if existing[1] == "published" else set()
+        
+        text = analyze(post_update.content)
+        excerpt = post_update.excerpt or text.excerpt
         
-        # Update post
+        # Update post, refreshing the hashes autosave compares against so
+        # a later autosave of the previous body isn't taken as unchanged
         cursor.execute("""
         UPDATE posts SET
             title = %s,
@@ -611,385 +946,500 @@ async def update_post(
             status = %s,
             reading_time = %s,
             published_at = %s,
-            updated_at = NOW()
+            content_hash = %s,
+            taxonomy_hash = %s,
+            updated_at = NOW(6)
         WHERE id = %s
         """, (
-            post_update.title, post_update.content, post_update.excerpt,
-            post_update.featured_image, post_update.status, reading_time,
-            datetime.now() if post_update.status == "published" else None,
+            post_update.title, post_update.content, excerpt,
+            post_update.featured_image, post_update.status, text.reading_time,
+            datetime.now(timezone.utc).replace(tzinfo=None) if post_update.status == "published" else None,
+            content_hash(post_update.title, post_update.content, post_update.excerpt, post_update.featured_image),
+            taxonomy_hash(post_update.categories, post_update.tags),
             post_id
         ))
         
-        # Update categories
-        # First, remove all existing category relationships
-        cursor.execute("DELETE FROM post_categories WHERE post_id = %s", (post_id,))
-        
-        # Add new category relationships
-        for category_name in post_update.categories:
-            # Get or create category
-            cursor.execute(
-                "SELECT id FROM categories WHERE name = %s",
-                (category_name,)
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                category_id = result[0]
-            else:
-                # Create new category
-                slug = category_name.lower().replace(" ", "-")
-                cursor.execute(
-                    "INSERT INTO categories (name, slug) VALUES (%s, %s)",
-                    (category_name, slug)
-                )
-                category_id = cursor.lastrowid
-            
-            # Link post to category
-            cursor.execute(
-                "INSERT INTO post_categories (post_id, category_id) VALUES (%s, %s)",
-                (post_id, category_id)
-            )
-        
-        # Update tags
-        # First, remove all existing tag relationships
-        cursor.execute("DELETE FROM post_tags WHERE post_id = %s", (post_id,))
-        
-        # Add new tag relationships
-        for tag_name in post_update.tags:
-            # Get or create tag
-            cursor.execute(
-                "SELECT id FROM tags WHERE name = %s",
-                (tag_name,)
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                tag_id = result[0]
-            else:
-                # Create new tag
-                slug = tag_name.lower().replace(" ", "-")
-                cursor.execute(
-                    "INSERT INTO tags (name, slug) VALUES (%s, %s)",
-                    (tag_name, slug)
-                )
-                tag_id = cursor.lastrowid
-            
-            # Link post to tag
-            cursor.execute(
-                "INSERT INTO post_tags (post_id, tag_id) VALUES (%s, %s)",
-                (post_id, tag_id)
-            )
+        # Update category and tag relationships
+        _sync_post_taxonomy(cursor, post_id, post_update.categories, post_update.tags)
+        if post_update.status == "published":
+            feed_scopes |= post_feed_scopes(cursor, [post_id])
+        invalidate_feeds(cursor, feed_scopes)
+        record_revision(
+            cursor, post_id, existing[0], post_update.title, post_update.content,
+            excerpt, post_update.featured_image,
+            post_update.categories, post_update.tags
+        )
         
         # Commit transaction
         db.commit()
         
-        # Retrieve the updated post with author details
-        cursor.execute("""
-        SELECT p.*, u.id as author_id, u.name as author_name, u.avatar as author_avatar
-        FROM posts p
-        JOIN users u ON p.author_id = u.id
-        WHERE p.id = %s
-        """, (post_id,))
-        
-        post_data = cursor.fetchone()
-        
-        # Create author object
-        author = {
-            "id": post_data[10],  # author_id
-            "name": post_data[11],  # author_name
-            "avatar": post_data[12]  # author_avatar
-        }
-        
-        # Create the response
-        updated_post = {
-            "id": post_id,
-            "title": post_update.title,
-            "content": post_update.content,
-            "excerpt": post_update.excerpt,
-            "featured_image": post_update.featured_image,
-            "status": post_update.status,
-            "author": author,
-            "categories": post_update.categories,
-            "tags": post_update.tags,
-            "created_at": post_data[7],  # created_at
-            "updated_at": datetime.now(),
-            "published_at": datetime.now() if post_update.status == "published" else post_data[9],  # published_at
-            "reading_time": reading_time
-        }
-        
-        return updated_post
+        return _saved_post(db, post_id, post_update.categories, post_update.tags)
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
 
-@app.delete("/api/posts/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_post(post_id: int, db: mysql.connector.connection.MySQLConnection = Depends(get_db)):
+@app.put("/api/posts/{post_id}", response_model=Post)
+async def update_post(
+    post_id: int,
+    post_update: PostUpdate
+):
+    updated = await run_db(_update_post, post_id, post_update)
+    taxonomy_cache.invalidate()
+    _invalidate_post(post_id)
+    return updated
+
+def _delete_post(db: mysql.connector.connection.MySQLConnection, post_id: int):
     cursor = db.cursor()
     
     try:
-        # Check if post exists
-        cursor.execute("SELECT id FROM posts WHERE id = %s", (post_id,))
-        if not cursor.fetchone():
+        # Check if post exists, locking it against a concurrent delete
+        cursor.execute("SELECT status FROM posts WHERE id = %s FOR UPDATE", (post_id,))
+        existing = cursor.fetchone()
+        if not existing:
             raise HTTPException(status_code=404, detail="Post not found")
+        feed_scopes = post_feed_scopes(cursor, [post_id]) if existing[0] == "published" else set()
         
-        # Delete post (cascade will handle relationships)
+        # Delete post, keeping taxonomy counts in step with its links
+        _unlink_post_taxonomy(cursor, post_id)
         cursor.execute("DELETE FROM posts WHERE id = %s", (post_id,))
+        _bump_versions(cursor, "posts", "taxonomy")
+        invalidate_feeds(cursor, feed_scopes)
         db.commit()
         
         return None
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         cursor.close()
 
-# Drafts
-@app.get("/api/drafts", response_model=List[Post])
-async def get_drafts(db: mysql.connector.connection.MySQLConnection = Depends(get_db)):
-    cursor = db.cursor(dictionary=True)
+@app.delete("/api/posts/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_post(post_id: int):
+    await run_db(_delete_post, post_id)
+    taxonomy_cache.invalidate()
+    _invalidate_post(post_id)
+
+# Revisions
+def _get_revisions(db: mysql.connector.connection.MySQLConnection, post_id: int):
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT id FROM posts WHERE id = %s", (post_id,))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Post not found")
+        return list_revisions(cursor, post_id)
+    finally:
+        cursor.close()
+
+@app.get("/api/posts/{post_id}/revisions", response_model=List[RevisionSummary])
+async def get_revisions(post_id: int):
+    return await run_db(_get_revisions, post_id)
+
+def _get_revision(db: mysql.connector.connection.MySQLConnection, post_id: int, revision: int):
+    cursor = db.cursor()
+    try:
+        saved = load_revision(cursor, post_id, revision)
+        if saved is None:
+            raise HTTPException(status_code=404, detail="Revision not found")
+        return saved
+    finally:
+        cursor.close()
+
+@app.get("/api/posts/{post_id}/revisions/{revision}", response_model=Revision)
+async def get_revision(post_id: int, revision: int):
+    return await run_db(_get_revision, post_id, revision)
+
+def _restore_revision(db: mysql.connector.connection.MySQLConnection, post_id: int, revision: int):
+    """Save an old revision as the post's current version.
     
-    cursor.execute("""
-    SELECT p.*, u.id as author_id, u.name as author_name, u.avatar as author_avatar
+    The restore is recorded as a new revision, so history only grows.
+    """
+    saved = _get_revision(db, post_id, revision)
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT status FROM posts WHERE id = %s", (post_id,))
+        current = cursor.fetchone()
+    finally:
+        cursor.close()
+    # End the read's implicit transaction before _update_post starts its own
+    db.rollback()
+    if not current:
+        raise HTTPException(status_code=404, detail="Post not found")
+    
+    return _update_post(db, post_id, PostUpdate(
+        title=saved["title"],
+        content=saved["content"],
+        excerpt=saved["excerpt"],
+        featured_image=saved["featured_image"],
+        status=current[0],
+        categories=saved["categories"],
+        tags=saved["tags"],
+    ))
+
+@app.post("/api/posts/{post_id}/revisions/{revision}/restore", response_model=Post)
+async def restore_revision(post_id: int, revision: int):
+    restored = await run_db(_restore_revision, post_id, revision)
+    taxonomy_cache.invalidate()
+    _invalidate_post(post_id)
+    return restored
+
+# Drafts
+def _drafts_query(limit: Optional[int] = None, after: Optional[tuple] = None, summary: bool = False):
+    """Return the SQL and params listing drafts for ``GET /api/drafts``."""
+    query = f"""
+    SELECT {POST_SUMMARY_COLUMNS if summary else POST_COLUMNS}
     FROM posts p
     JOIN users u ON p.author_id = u.id
     WHERE p.status = 'draft'
-    ORDER BY p.updated_at DESC
-    """)
+    """
+    params = []
     
-    drafts_data = cursor.fetchall()
+    if after:
+        condition, after_params = _keyset_condition("updated_at", after)
+        query += " AND " + condition
+        params.extend(after_params)
     
-    # Process drafts to include categories and tags
-    drafts = []
-    for draft in drafts_data:
-        # Get categories for this post
-        cursor.execute("""
-        SELECT c.name FROM categories c
-        JOIN post_categories pc ON c.id = pc.category_id
-        WHERE pc.post_id = %s
-        """, (draft["id"],))
-        categories = [row[0] for row in cursor.fetchall()]
-        
-        # Get tags for this post
-        cursor.execute("""
-        SELECT t.name FROM tags t
-        JOIN post_tags pt ON t.id = pt.tag_id
-        WHERE pt.post_id = %s
-        """, (draft["id"],))
-        tags = [row[0] for row in cursor.fetchall()]
-        
-        # Create author object
-        author = {
-            "id": draft["author_id"],
-            "name": draft["author_name"],
-            "avatar": draft["author_avatar"]
-        }
-        
-        # Add to drafts list
-        drafts.append({
-            "id": draft["id"],
-            "title": draft["title"],
-            "content": draft["content"],
-            "excerpt": draft["excerpt"],
-            "featured_image": draft["featured_image"],
-            "status": draft["status"],
-            "author": author,
-            "categories": categories,
-            "tags": tags,
-            "created_at": draft["created_at"],
-            "updated_at": draft["updated_at"],
-            "published_at": draft["published_at"],
-            "reading_time": draft["reading_time"]
-        })
+    query += " ORDER BY p.updated_at DESC, p.id DESC"
+    
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit + 1)
+    
+    return query, params
+
+def _get_drafts(
+    db: mysql.connector.connection.MySQLConnection,
+    limit: Optional[int] = None,
+    after: Optional[tuple] = None,
+    summary: bool = False
+):
+    cursor = db.cursor(dictionary=True)
+    query, params = _drafts_query(limit, after, summary)
+    cursor.execute(query, params)
+    drafts_data, next_cursor = _paginate(cursor.fetchall(), limit, "updated_at")
+    
+    # Fetch categories and tags for the whole result set in two queries
+    categories, tags = _fetch_post_taxonomy(db, [draft["id"] for draft in drafts_data])
+    drafts = [
+        _post_from_row(draft, categories[draft["id"]], tags[draft["id"]])
+        for draft in drafts_data
+    ]
     
     cursor.close()
-    return drafts
+    return drafts, next_cursor
+
+@app.get("/api/drafts", response_model=Union[List[Post], List[PostSummary]])
+async def get_drafts(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$")
+):
+    limit, after = _page_params(limit, cursor)
+    etag, result = await run_read(
+        _read_if_changed, "posts", request.headers.get("if-none-match"),
+        _get_drafts, limit, after, view == "summary"
+    )
+    not_modified = _conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    drafts, next_cursor = result
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return _json_response(drafts, response)
 
 # Auto-save route
-@app.post("/api/drafts/autosave", response_model=Post)
-async def autosave_draft(post: PostCreate, db: mysql.connector.connection.MySQLConnection = Depends(get_db)):
+def _autosave_lookup_query(post_id: Optional[int], title: str):
+    """Return the SQL and params locking the draft an autosave writes to."""
+    # Drafts are identified by id; clients that haven't received one
+    # yet are matched by title, as before
+    if post_id is not None:
+        where, params = "p.id = %s", (post_id,)
+    else:
+        where, params = "p.title = %s", (title,)
+    return f"""
+    SELECT {POST_COLUMNS}, p.content_hash, p.taxonomy_hash
+    FROM posts p
+    JOIN users u ON p.author_id = u.id
+    WHERE {where} AND p.status = 'draft'
+    ORDER BY p.id
+    LIMIT 1
+    FOR UPDATE
+    """, params
+
+def _autosave_draft(db: mysql.connector.connection.MySQLConnection, post: DraftAutosave):
+    """Create or update a draft, writing only what changed since the last save.
+    
+    Returns the saved draft and whether anything was written.
+    """
     cursor = db.cursor()
+    row_cursor = db.cursor(dictionary=True)
+    body_hash = content_hash(post.title, post.content, post.excerpt, post.featured_image)
+    terms_hash = taxonomy_hash(post.categories, post.tags)
     
     try:
-        # Calculate reading time
-        words = len(post.content.split())
-        reading_time = max(1, int(words / 200))
+        db.start_transaction()
         
-        # Check if a draft with this title exists
-        cursor.execute(
-            "SELECT id FROM posts WHERE title = %s AND status = 'draft'",
-            (post.title,)
-        )
-        result = cursor.fetchone()
+        row_cursor.execute(*_autosave_lookup_query(post.id, post.title))
+        existing = row_cursor.fetchone()
+        if existing is None and post.id is not None:
+            raise HTTPException(status_code=404, detail="Draft not found")
         
-        if result:
-            # Update existing draft
-            post_id = result[0]
-            cursor.execute("""
-            UPDATE posts SET
-                content = %s,
-                excerpt = %s,
-                featured_image = %s,
-                reading_time = %s,
-                updated_at = NOW()
-            WHERE id = %s
-            """, (
-                post.content, post.excerpt, post.featured_image,
-                reading_time, post_id
-            ))
-            
-            # Update categories and tags
-            # This is simplified - in a real app you'd handle this more efficiently
-            cursor.execute("DELETE FROM post_categories WHERE post_id = %s", (post_id,))
-            cursor.execute("DELETE FROM post_tags WHERE post_id = %s", (post_id,))
-            
-            # Add categories
-            for category_name in post.categories:
-                cursor.execute(
-                    "SELECT id FROM categories WHERE name = %s",
-                    (category_name,)
-                )
-                cat_result = cursor.fetchone()
-                
-                if cat_result:
-                    category_id = cat_result[0]
-                else:
-                    slug = category_name.lower().replace(" ", "-")
-                    cursor.execute(
-                        "INSERT INTO categories (name, slug) VALUES (%s, %s)",
-                        (category_name, slug)
-                    )
-                    category_id = cursor.lastrowid
-                
-                cursor.execute(
-                    "INSERT INTO post_categories (post_id, category_id) VALUES (%s, %s)",
-                    (post_id, category_id)
-                )
-            
-            # Add tags
-            for tag_name in post.tags:
-                cursor.execute(
-                    "SELECT id FROM tags WHERE name = %s",
-                    (tag_name,)
-                )
-                tag_result = cursor.fetchone()
-                
-                if tag_result:
-                    tag_id = tag_result[0]
-                else:
-                    slug = tag_name.lower().replace(" ", "-")
-                    cursor.execute(
-                        "INSERT INTO tags (name, slug) VALUES (%s, %s)",
-                        (tag_name, slug)
-                    )
-                    tag_id = cursor.lastrowid
-                
+        body_changed = existing is None or existing["content_hash"] != body_hash
+        terms_changed = existing is None or existing["taxonomy_hash"] != terms_hash
+        if not (body_changed or terms_changed):
+            db.rollback()
+            return _post_from_row(existing, post.categories, post.tags), False
+        
+        # Stamp the row from here so the response carries the stored value
+        # without reading it back
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        # Cached by content, so saves that only change the title or
+        # taxonomy don't rescan the body
+        text = analyze(post.content)
+        excerpt = post.excerpt or text.excerpt
+        reading_time = text.reading_time
+        
+        if existing:
+            post_id = existing["id"]
+            saved = _post_from_row(existing, post.categories, post.tags)
+            if body_changed:
+                cursor.execute("""
+                UPDATE posts SET
+                    title = %s,
+                    content = %s,
+                    excerpt = %s,
+                    featured_image = %s,
+                    reading_time = %s,
+                    content_hash = %s,
+                    taxonomy_hash = %s,
+                    updated_at = %s
+                WHERE id = %s
+                """, (
+                    post.title, post.content, excerpt, post.featured_image,
+                    reading_time, body_hash, terms_hash, now, post_id
+                ))
+            else:
                 cursor.execute(
-                    "INSERT INTO post_tags (post_id, tag_id) VALUES (%s, %s)",
-                    (post_id, tag_id)
+                    "UPDATE posts SET taxonomy_hash = %s, updated_at = %s WHERE id = %s",
+                    (terms_hash, now, post_id)
                 )
         else:
-            # Create new draft
             cursor.execute("""
             INSERT INTO posts (
-                title, content, excerpt, featured_image, status, 
-                author_id, reading_time
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+                title, content, excerpt, featured_image, status,
+                author_id, reading_time, content_hash, taxonomy_hash,
+                created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, (
-                post.title, post.content, post.excerpt, post.featured_image,
+                post.title, post.content, excerpt, post.featured_image,
                 'draft', 1,  # Hardcoded author_id for demo
-                reading_time
+                reading_time, body_hash, terms_hash, now, now
             ))
-            
             post_id = cursor.lastrowid
             
-            # Add categories and tags (similar to above)
-            for category_name in post.categories:
-                cursor.execute(
-                    "SELECT id FROM categories WHERE name = %s",
-                    (category_name,)
-                )
-                cat_result = cursor.fetchone()
-                
-                if cat_result:
-                    category_id = cat_result[0]
-                else:
-                    slug = category_name.lower().replace(" ", "-")
-                    cursor.execute(
-                        "INSERT INTO categories (name, slug) VALUES (%s, %s)",
-                        (category_name, slug)
-                    )
-                    category_id = cursor.lastrowid
-                
-                cursor.execute(
-                    "INSERT INTO post_categories (post_id, category_id) VALUES (%s, %s)",
-                    (post_id, category_id)
-                )
-            
-            for tag_name in post.tags:
-                cursor.execute(
-                    "SELECT id FROM tags WHERE name = %s",
-                    (tag_name,)
-                )
-                tag_result = cursor.fetchone()
-                
-                if tag_result:
-                    tag_id = tag_result[0]
-                else:
-                    slug = tag_name.lower().replace(" ", "-")
-                    cursor.execute(
-                        "INSERT INTO tags (name, slug) VALUES (%s, %s)",
-                        (tag_name, slug)
-                    )
-                    tag_id = cursor.lastrowid
-                
-                cursor.execute(
-                    "INSERT INTO post_tags (post_id, tag_id) VALUES (%s, %s)",
-                    (post_id, tag_id)
-                )
+            # Only a new draft needs its author looked up
+            row_cursor.execute("SELECT id, name, avatar FROM users WHERE id = 1")
+            author = row_cursor.fetchone()
+            saved = _post_from_row({
+                "id": post_id,
+                "title": post.title,
+                "excerpt": excerpt,
+                "featured_image": post.featured_image,
+                "status": "draft",
+                "author_id": author["id"],
+                "author_name": author["name"],
+                "author_avatar": author["avatar"],
+                "created_at": now,
+                "updated_at": now,
+                "published_at": None,
+                "reading_time": reading_time,
+            }, post.categories, post.tags)
         
-        db.commit()
-        
-        # Retrieve author info
-        cursor.execute(
-            "SELECT id, name, avatar FROM users WHERE id = 1"
+        # Category and tag links are only diffed when the names changed
+        if terms_changed:
+            _sync_post_taxonomy(cursor, post_id, post.categories, post.tags, new_post=existing is None)
+        else:
+            _bump_versions(cursor, "posts")
+        record_revision(
+            cursor, post_id, existing["content"] if existing else None, post.title,
+            post.content, excerpt, post.featured_image, post.categories, post.tags
         )
-        author_data = cursor.fetchone()
         
-        author = {
-            "id": author_data[0],
-            "name": author_data[1],
-            "avatar": author_data[2]
-        }
+        db.commit()
         
-        # Create response
-        now = datetime.now()
-        saved_draft = {
-            "id": post_id,
+        saved.update({
             "title": post.title,
             "content": post.content,
-            "excerpt": post.excerpt,
+            "excerpt": excerpt,
             "featured_image": post.featured_image,
-            "status": "draft",
-            "author": author,
-            "categories": post.categories,
-            "tags": post.tags,
-            "created_at": now,
             "updated_at": now,
-            "published_at": None,
-            "reading_time": reading_time
-        }
-        
-        return saved_draft
+            "reading_time": reading_time,
+        })
+        return saved, True
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
+        row_cursor.close()
         cursor.close()
 
+async def _flush_autosave(post: DraftAutosave):
+    saved, written = await run_db(_autosave_draft, post)
+    if written:
+        taxonomy_cache.invalidate()
+        _invalidate_post(saved["id"])
+    return saved
+
+@app.post("/api/drafts/autosave", response_model=Post)
+async def autosave_draft(post: DraftAutosave):
+    # Saves for the same draft arriving in a burst are written once, with
+    # the latest payload; every caller in the burst gets that result
+    key = ("id", post.id) if post.id is not None else ("title", post.title)
+    return await autosave_coalescer.submit(key, post, _flush_autosave)
+
+# Feeds
+# Stored gzipped in the feeds table and rendered again, all formats of a
+# scope at once, on the first request after a write to one of its posts
+_feed_renders = {}
+
+def _feed_paths(scope: str) -> dict:
+    if scope == SITE_SCOPE:
+        base = "/api/feeds"
+    else:
+        kind, _, slug = scope.partition(":")
+        base = f"/api/feeds/{'categories' if kind == 'category' else 'tags'}/{slug}"
+    return {fmt: f"{base}/{fmt}" for fmt in FEED_FORMATS}
+
+async def _render_feed(scope: str):
+    """Render the feeds of ``scope``, sharing one rendering between concurrent requests."""
+    task = _feed_renders.get(scope)
+    if task is None:
+        task = asyncio.ensure_future(run_db(render_feeds, scope, _feed_paths(scope)))
+        _feed_renders[scope] = task
+        task.add_done_callback(lambda _: _feed_renders.pop(scope, None))
+    return await asyncio.shield(task)
+
+async def _serve_feed(request: Request, scope: str, fmt: str):
+    feed = await run_read(load_feed, scope, fmt)
+    if feed is None:
+        rendered = await _render_feed(scope)
+        if rendered is None:
+            raise HTTPException(status_code=404, detail="Feed not found")
+        feed = rendered[fmt]
+    
+    body, digest, last_modified = feed
+    etag = _etag("feed", digest)
+    last_modified = _as_utc(last_modified) if last_modified else None
+    headers = _validator_headers(etag, last_modified)
+    headers["Vary"] = "Accept-Encoding"
+    # Only the ETag is checked: Last-Modified has a one-second resolution,
+    # and a feed can change within the second it was last served
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    if accepts(request.headers.get("accept-encoding"), "gzip"):
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    return Response(content=body, media_type=FEED_FORMATS[fmt], headers=headers)
+
+FEED_FORMAT = Path(..., pattern="^(rss|atom|json)$")
+
+@app.get("/api/feeds/{fmt}")
+async def get_site_feed(request: Request, fmt: str = FEED_FORMAT):
+    return await _serve_feed(request, SITE_SCOPE, fmt)
+
+@app.get("/api/feeds/categories/{slug}/{fmt}")
+async def get_category_feed(request: Request, slug: str, fmt: str = FEED_FORMAT):
+    return await _serve_feed(request, f"category:{slug}", fmt)
+
+@app.get("/api/feeds/tags/{slug}/{fmt}")
+async def get_tag_feed(request: Request, slug: str, fmt: str = FEED_FORMAT):
+    return await _serve_feed(request, f"tag:{slug}", fmt)
+
+# Export
+@app.get("/api/export/posts")
+async def export_all_posts(status: Optional[str] = None):
+    # Rows stream from an unbuffered cursor as they are read, so memory use
+    # doesn't grow with the number of posts; taxonomy names are read on a
+    # second connection, or, in pools too small for two, after each page of
+    # posts on the same one. The connections are taken and the first chunk
+    # read before the response starts, so running out of connections or a
+    # failing query is still reported as a 503.
+    connections = 2 if pool.size + pool.max_overflow >= 2 else 1
+    try:
+        chunks = await iterate_db(export_posts, status=status, connections=connections)
+    except mysql.connector.Error as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="posts.ndjson"'},
+        background=BackgroundTask(chunks.aclose),
+    )
+
+# Import
+class ImportFailure(BaseModel):
+    line: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportFailure]
+
+async def _request_lines(request: Request):
+    """Yield the lines of a request body as it arrives."""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+@app.post("/api/import/posts", response_model=ImportResult)
+async def import_posts(request: Request, batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=5000)):
+    # The NDJSON body is read in batches as it arrives; each batch is
+    # inserted in one transaction with multi-row statements
+    imported = 0
+    errors = []
+    batch = []
+    number = 0
+    async for line in _request_lines(request):
+        number += 1
+        if not line.strip():
+            continue
+        batch.append((number, line.decode("utf-8", errors="replace")))
+        if len(batch) >= batch_size:
+            count, batch_errors = await run_db(import_lines, batch)
+            imported += count
+            errors.extend(batch_errors)
+            batch = []
+    if batch:
+        count, batch_errors = await run_db(import_lines, batch)
+        imported += count
+        errors.extend(batch_errors)
+    
+    if imported:
+        taxonomy_cache.invalidate()
+    return {"imported": imported, "failed": len(errors), "errors": errors}
+
 # Run the application
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
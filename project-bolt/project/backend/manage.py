@@ -0,0 +1,178 @@
+"""Command-line administration for the Blog API backend.
+
+    python manage.py migrate        # create the database and tables, apply pending migrations
+    python manage.py explain        # show which index each hot query uses
+    python manage.py repair-counts  # recompute category/tag post counts
+    python manage.py export         # write every post to stdout as NDJSON
+    python manage.py import FILE    # create posts from an NDJSON file
+"""
+import argparse
+from datetime import datetime
+import re
+import sys
+
+from db import DB_ENGINE, connect
+from migrations import create_tables, current_version, repair_counts
+from taxonomy import terms_by_name_query
+from transfer import IMPORT_BATCH_SIZE, export_posts, import_posts
+
+# Keyset position the paging checks read after
+EXPLAIN_CURSOR = (datetime(2024, 1, 1), 100)
+
+
+def primary_key(table):
+    """Return the name the query plan gives ``table``'s primary key."""
+    return f"sqlite_autoindex_{table}_1" if DB_ENGINE == "sqlite" else "PRIMARY"
+
+
+def explain_checks():
+    """Return the hot queries as ``(name, query, params, table, expected indexes)``.
+
+    The SQL comes from the same builders the API handlers run, so the
+    checks follow any change to the real queries.
+    """
+    # Imported here so the other commands don't load the API
+    from main import _autosave_lookup_query, _drafts_query, _posts_query
+
+    return [
+        ("list published posts", *_posts_query("published", None, None, 20),
+         "p", ("idx_posts_status_created",)),
+        ("list published posts after a cursor", *_posts_query("published", None, None, 20, EXPLAIN_CURSOR),
+         "p", ("idx_posts_status_created",)),
+        ("list all posts", *_posts_query(None, None, None, 20),
+         "p", ("idx_posts_created",)),
+        ("list all posts after a cursor", *_posts_query(None, None, None, 20, EXPLAIN_CURSOR),
+         "p", ("idx_posts_created",)),
+        ("list drafts", *_drafts_query(20),
+         "p", ("idx_posts_status_updated",)),
+        ("list drafts after a cursor", *_drafts_query(20, EXPLAIN_CURSOR),
+         "p", ("idx_posts_status_updated",)),
+        # Depending on its statistics, the planner reads the posts of a term
+        # through the join table's reverse key, or walks the posts in order
+        # and probes the join table's primary key
+        ("filter posts by category", *_posts_query("published", "development", None, 20),
+         "pc", ("idx_post_categories_category", primary_key("post_categories"))),
+        ("filter posts by tag", *_posts_query("published", None, "react", 20),
+         "pt", ("idx_post_tags_tag", primary_key("post_tags"))),
+        ("autosave draft lookup", *_autosave_lookup_query(None, "Untitled"),
+         "p", ("idx_posts_title_status",)),
+        ("category lookup by name", *terms_by_name_query("categories", ["Development"]),
+         "categories", ("idx_categories_name",)),
+        ("tag lookup by name", *terms_by_name_query("tags", ["react"]),
+         "tags", ("idx_tags_name",)),
+    ]
+
+
+def cmd_migrate(args):
+    applied = create_tables()
+    if applied:
+        print(f"Applied schema migrations: {', '.join(map(str, applied))}")
+    conn = connect()
+    try:
+        print(f"Schema is at version {current_version(conn)}")
+    finally:
+        conn.close()
+    return 0
+
+
+# A table step of SQLite's EXPLAIN QUERY PLAN, e.g.
+# "SEARCH p USING COVERING INDEX idx_posts_status_created (status=?)"
+SQLITE_PLAN_RE = re.compile(r"^(?:SCAN|SEARCH) (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+
+
+def index_used(cursor, query, params, table):
+    """Return the index the query plan reads ``table`` through, or None."""
+    if DB_ENGINE == "sqlite":
+        cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+        for row in cursor.fetchall():
+            match = SQLITE_PLAN_RE.match(row["detail"])
+            if match and match.group(1) == table:
+                return match.group(2)
+        return None
+    cursor.execute("EXPLAIN " + query, params)
+    plan = {row["table"]: row for row in cursor.fetchall()}
+    return plan.get(table, {}).get("key")
+
+
+def cmd_explain(args):
+    conn = connect()
+    cursor = conn.cursor(dictionary=True)
+    failures = 0
+    try:
+        for name, query, params, table, expected in explain_checks():
+            key = index_used(cursor, query, params, table)
+            ok = key in expected
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: {table} uses {key or 'no index'}"
+                  + ("" if ok else f" (expected {' or '.join(expected)})"))
+    finally:
+        cursor.close()
+        conn.close()
+    return 1 if failures else 0
+
+
+def cmd_repair_counts(args):
+    conn = connect()
+    try:
+        repair_counts(conn)
+    finally:
+        conn.close()
+    print("Category and tag post counts recomputed")
+    return 0
+
+
+def cmd_export(args):
+    conn = connect()
+    taxonomy_conn = connect()
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_posts(conn, taxonomy_conn, args.status):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+        taxonomy_conn.close()
+        conn.close()
+    return 0
+
+
+def cmd_import(args):
+    conn = connect()
+    try:
+        with open(args.file, encoding="utf-8") as f:
+            summary = import_posts(conn, f, args.batch_size)
+    finally:
+        conn.close()
+    for error in summary["errors"]:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    print(f"Imported {summary['imported']} posts, {summary['failed']} failed")
+    return 1 if summary["failed"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Blog API administration")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Create the database and tables and apply pending migrations")
+    commands.add_parser("explain", help="Check that hot queries use their indexes")
+    commands.add_parser("repair-counts", help="Recompute category and tag post counts")
+    export = commands.add_parser("export", help="Write posts as NDJSON")
+    export.add_argument("--status", help="Only export posts with this status")
+    export.add_argument("-o", "--output", help="File to write instead of stdout")
+    import_ = commands.add_parser("import", help="Create posts from an NDJSON file")
+    import_.add_argument("file", help="NDJSON file, e.g. one written by export")
+    import_.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+                         help="Posts inserted per transaction")
+
+    args = parser.parse_args(argv)
+    handler = {
+        "migrate": cmd_migrate,
+        "explain": cmd_explain,
+        "repair-counts": cmd_repair_counts,
+        "export": cmd_export,
+        "import": cmd_import,
+    }[args.command]
+    return handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Request and query metrics in the Prometheus text format, and the slow-query log.
+
+``MetricsMiddleware`` times every request and records its response size.
+The database layer reports each query and connection checkout through
+``record_query`` and ``record_pool_wait``, which add to the statistics of
+the request being served (carried in a context variable that ``run_db``
+copies into its worker threads) as well as to process-wide totals.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+
+# Queries taking at least this long are logged to the "blog.slow_query"
+# logger; 0 disables the log.
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_MS", "500")) / 1000
+
+slow_query_log = logging.getLogger("blog.slow_query")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., sum, count]
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _labels(self.labels + ("le",), label_values + (_number(bound),))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _labels(self.labels + ("le",), label_values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                labels = _labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {_number(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time spent serving requests",
+    ("method", "route", "status")
+)
+response_size = Histogram(
+    "http_response_size_bytes", "Size of response bodies",
+    ("method", "route"), SIZE_BUCKETS
+)
+request_queries = Histogram(
+    "db_queries_per_request", "Database queries run while serving a request",
+    ("route",), COUNT_BUCKETS
+)
+request_query_time = Histogram(
+    "db_query_seconds_per_request", "Time spent in database queries while serving a request",
+    ("route",)
+)
+request_pool_wait = Histogram(
+    "db_pool_wait_seconds_per_request", "Time spent waiting for pooled connections while serving a request",
+    ("route",)
+)
+query_duration = Histogram("db_query_duration_seconds", "Time spent in each database query")
+pool_wait = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection at each checkout"
+)
+slow_queries = Counter("db_slow_queries_total", "Queries slower than the slow-query threshold")
+
+METRICS = [
+    request_duration, response_size, request_queries, request_query_time,
+    request_pool_wait, query_duration, pool_wait, slow_queries,
+]
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "pool_wait_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def record_query(statement, seconds):
+    query_duration.observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += seconds
+    if SLOW_QUERY_SECONDS and seconds >= SLOW_QUERY_SECONDS:
+        slow_queries.inc()
+        # The statement is logged without its parameters, which may hold
+        # whole post bodies
+        slow_query_log.warning("%.1f ms: %s", seconds * 1000, " ".join(str(statement).split()))
+
+
+def record_pool_wait(seconds):
+    pool_wait.observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, response size and query statistics per route.
+
+    Requests are labelled by their route's path template so that
+    ``/api/posts/1`` and ``/api/posts/2`` share one series. Streaming
+    responses are measured when their last chunk has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            request_duration.observe(time.perf_counter() - started, method, route, str(status))
+            response_size.observe(size, method, route)
+            request_queries.observe(stats.queries, route)
+            request_query_time.observe(stats.query_seconds, route)
+            request_pool_wait.observe(stats.pool_wait_seconds, route)
+
+
+def render(gauges=()):
+    """Return every metric, plus ``(name, help, value)`` gauges, in the Prometheus text format."""
+    lines = []
+    for name, help, value in gauges:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+    for metric in METRICS:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,446 @@
+"""Database schema and versioned migrations for the Blog API.
+
+The base tables are created by ``create_tables``. Every later schema change
+is appended to ``MIGRATIONS`` with the next version number, and
+``apply_migrations`` runs whatever the ``schema_migrations`` table has not
+recorded yet. Both run from ``python manage.py migrate``, once per deploy;
+API workers only call ``check_schema`` at startup, which fails if the
+database is behind ``SCHEMA_VERSION``.
+
+With ``DB_ENGINE=sqlite`` the base tables come from ``SQLITE_TABLES`` and
+each migration runs its statements from ``SQLITE_MIGRATIONS``, which keep
+the same tables and indexes in SQLite's dialect; a new migration needs an
+entry in both.
+"""
+import mysql.connector
+
+from db import DB_CONFIG, DB_ENGINE, connect
+
+# MySQL errors meaning a migration step already took effect. DDL commits
+# implicitly, so a migration interrupted halfway is safe to re-run.
+ALREADY_APPLIED_ERRNOS = {
+    1060,  # Duplicate column name
+    1061,  # Duplicate key name
+}
+
+# Recompute the materialized post counts of every category and tag
+RECOUNT_STATEMENTS = [
+    """UPDATE categories SET post_count = (
+        SELECT COUNT(*) FROM post_categories pc WHERE pc.category_id = categories.id
+    )""",
+    """UPDATE tags SET post_count = (
+        SELECT COUNT(*) FROM post_tags pt WHERE pt.tag_id = tags.id
+    )""",
+]
+
+# (version, description, statements)
+MIGRATIONS = [
+    (1, "Indexes for post listing, taxonomy lookups and autosave", [
+        # get_posts: optional status filter, newest first, keyset on (created_at, id)
+        "CREATE INDEX idx_posts_status_created ON posts (status, created_at, id)",
+        "CREATE INDEX idx_posts_created ON posts (created_at, id)",
+        # get_drafts: status = 'draft', most recently updated first
+        "CREATE INDEX idx_posts_status_updated ON posts (status, updated_at, id)",
+        # autosave_draft: draft lookup by title
+        "CREATE INDEX idx_posts_title_status ON posts (title, status)",
+        # get-or-create of categories and tags by name
+        "CREATE INDEX idx_categories_name ON categories (name)",
+        "CREATE INDEX idx_tags_name ON tags (name)",
+        # category / tag filters walk the join tables from the taxonomy side
+        "CREATE INDEX idx_post_categories_category ON post_categories (category_id, post_id)",
+        "CREATE INDEX idx_post_tags_tag ON post_tags (tag_id, post_id)",
+    ]),
+    (2, "Materialized post counts for categories and tags", [
+        "ALTER TABLE categories ADD COLUMN post_count INT NOT NULL DEFAULT 0",
+        "ALTER TABLE tags ADD COLUMN post_count INT NOT NULL DEFAULT 0",
+    ] + RECOUNT_STATEMENTS),
+    (3, "Full-text index for post search", [
+        "ALTER TABLE posts ADD FULLTEXT INDEX ft_posts_text (title, excerpt, content)",
+    ]),
+    (4, "Result-set versions and sub-second post timestamps for HTTP validators", [
+        """CREATE TABLE IF NOT EXISTS data_versions (
+            name VARCHAR(32) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )""",
+        "INSERT IGNORE INTO data_versions (name) VALUES ('posts'), ('taxonomy')",
+        """ALTER TABLE posts MODIFY updated_at TIMESTAMP(6)
+            DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)""",
+    ]),
+    (5, "Content and taxonomy fingerprints for skipping unchanged autosaves", [
+        "ALTER TABLE posts ADD COLUMN content_hash CHAR(64) NULL",
+        "ALTER TABLE posts ADD COLUMN taxonomy_hash CHAR(64) NULL",
+    ]),
+    (6, "Post revision history", [
+        """CREATE TABLE IF NOT EXISTS post_revisions (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            post_id INT NOT NULL,
+            revision INT NOT NULL,
+            base_revision INT NOT NULL,
+            kind ENUM('snapshot', 'delta') NOT NULL,
+            data MEDIUMBLOB NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            meta TEXT NOT NULL,
+            content_hash CHAR(64) NOT NULL,
+            content_length INT NOT NULL,
+            created_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+            UNIQUE KEY uq_post_revisions_post_revision (post_id, revision),
+            FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE
+        )""",
+    ]),
+    (7, "Stored, precompressed feeds", [
+        """CREATE TABLE IF NOT EXISTS feeds (
+            scope VARCHAR(300) NOT NULL,
+            format VARCHAR(8) NOT NULL,
+            version INT NOT NULL DEFAULT 0,
+            body MEDIUMBLOB NULL,
+            digest CHAR(32) NULL,
+            last_modified TIMESTAMP(6) NULL,
+            PRIMARY KEY (scope, format)
+        )""",
+    ]),
+]
+
+
+# Timestamp default matching what sqlite_backend binds for datetimes
+_SQLITE_NOW = "(STRFTIME('%Y-%m-%d %H:%M:%f000', 'now'))"
+
+SQLITE_TABLES = f"""
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    avatar VARCHAR(255),
+    role VARCHAR(50) DEFAULT 'user',
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    updated_at TIMESTAMP DEFAULT {_SQLITE_NOW}
+);
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    slug VARCHAR(255) NOT NULL UNIQUE,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    updated_at TIMESTAMP DEFAULT {_SQLITE_NOW}
+);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    slug VARCHAR(255) NOT NULL UNIQUE,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    updated_at TIMESTAMP DEFAULT {_SQLITE_NOW}
+);
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL,
+    excerpt TEXT,
+    featured_image VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'draft',
+    author_id INT NOT NULL REFERENCES users(id),
+    reading_time INT DEFAULT 1,
+    created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    updated_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+    published_at TIMESTAMP NULL
+);
+CREATE TABLE IF NOT EXISTS post_categories (
+    post_id INT NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    category_id INT NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+    PRIMARY KEY (post_id, category_id)
+);
+CREATE TABLE IF NOT EXISTS post_tags (
+    post_id INT NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    tag_id INT NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
+    PRIMARY KEY (post_id, tag_id)
+);
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT {_SQLITE_NOW}
+);
+"""
+
+# SQLite statements of each migration, by version
+SQLITE_MIGRATIONS = {
+    1: [
+        "CREATE INDEX IF NOT EXISTS idx_posts_status_created ON posts (status, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_posts_status_updated ON posts (status, updated_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_posts_title_status ON posts (title, status)",
+        "CREATE INDEX IF NOT EXISTS idx_categories_name ON categories (name)",
+        "CREATE INDEX IF NOT EXISTS idx_tags_name ON tags (name)",
+        "CREATE INDEX IF NOT EXISTS idx_post_categories_category ON post_categories (category_id, post_id)",
+        "CREATE INDEX IF NOT EXISTS idx_post_tags_tag ON post_tags (tag_id, post_id)",
+    ],
+    2: [
+        "ALTER TABLE categories ADD COLUMN post_count INT NOT NULL DEFAULT 0",
+        "ALTER TABLE tags ADD COLUMN post_count INT NOT NULL DEFAULT 0",
+    ] + RECOUNT_STATEMENTS,
+    # An external-content FTS5 table over posts, kept current by triggers;
+    # search ranks matches with bm25()
+    3: [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+            title, excerpt, content, content='posts', content_rowid='id'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts (rowid, title, excerpt, content)
+            VALUES (new.id, new.title, new.excerpt, new.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, excerpt, content)
+            VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, excerpt, content ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, excerpt, content)
+            VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+            INSERT INTO posts_fts (rowid, title, excerpt, content)
+            VALUES (new.id, new.title, new.excerpt, new.content);
+        END""",
+        "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')",
+    ],
+    # Timestamps already keep microseconds, and nothing needs ON UPDATE:
+    # every write sets updated_at itself
+    4: [
+        """CREATE TABLE IF NOT EXISTS data_versions (
+            name VARCHAR(32) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )""",
+        "INSERT OR IGNORE INTO data_versions (name) VALUES ('posts'), ('taxonomy')",
+    ],
+    5: [
+        "ALTER TABLE posts ADD COLUMN content_hash CHAR(64) NULL",
+        "ALTER TABLE posts ADD COLUMN taxonomy_hash CHAR(64) NULL",
+    ],
+    6: [
+        f"""CREATE TABLE IF NOT EXISTS post_revisions (
+            id INTEGER PRIMARY KEY,
+            post_id INT NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+            revision INT NOT NULL,
+            base_revision INT NOT NULL,
+            kind TEXT NOT NULL CHECK (kind IN ('snapshot', 'delta')),
+            data BLOB NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            meta TEXT NOT NULL,
+            content_hash CHAR(64) NOT NULL,
+            content_length INT NOT NULL,
+            created_at TIMESTAMP DEFAULT {_SQLITE_NOW},
+            UNIQUE (post_id, revision)
+        )""",
+    ],
+    7: [
+        """CREATE TABLE IF NOT EXISTS feeds (
+            scope VARCHAR(300) NOT NULL,
+            format VARCHAR(8) NOT NULL,
+            version INT NOT NULL DEFAULT 0,
+            body BLOB NULL,
+            digest CHAR(32) NULL,
+            last_modified TIMESTAMP NULL,
+            PRIMARY KEY (scope, format)
+        )""",
+    ],
+}
+
+
+# The schema version this code expects
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+class SchemaError(RuntimeError):
+    """Raised when the database schema is missing or older than ``SCHEMA_VERSION``."""
+
+
+def current_version(conn):
+    """Return the highest applied migration version, or 0."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def check_schema(conn):
+    """Return the database's schema version, raising ``SchemaError`` if it is
+    missing or behind ``SCHEMA_VERSION``.
+
+    A newer version is accepted, so workers of the previous release keep
+    running while a deploy rolls out.
+    """
+    try:
+        version = current_version(conn)
+    except mysql.connector.Error as e:
+        raise SchemaError(
+            f"Database schema is not initialized ({e}); run `python manage.py migrate`"
+        ) from e
+    if version < SCHEMA_VERSION:
+        raise SchemaError(
+            f"Database schema is at version {version} but this code needs {SCHEMA_VERSION}; "
+            "run `python manage.py migrate`"
+        )
+    return version
+
+
+def repair_counts(conn):
+    """Recompute category and tag post counts from the link tables."""
+    cursor = conn.cursor()
+    try:
+        for statement in RECOUNT_STATEMENTS:
+            cursor.execute(statement)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def apply_migrations(conn):
+    """Apply every pending migration in order and return the applied versions."""
+    cursor = conn.cursor()
+    applied = []
+    try:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        version = current_version(conn)
+        
+        for migration_version, description, statements in MIGRATIONS:
+            if migration_version <= version:
+                continue
+            
+            if DB_ENGINE == "sqlite":
+                statements = SQLITE_MIGRATIONS[migration_version]
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except mysql.connector.Error as e:
+                    if e.errno not in ALREADY_APPLIED_ERRNOS:
+                        raise
+            
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (migration_version, description)
+            )
+            conn.commit()
+            applied.append(migration_version)
+        
+        return applied
+    finally:
+        cursor.close()
+
+
+def create_database():
+    """Create the configured MySQL database if it doesn't exist."""
+    if DB_ENGINE != "mysql":
+        return
+    # The database may not exist yet, so connect to the server only
+    conn = mysql.connector.connect(
+        host=DB_CONFIG["host"],
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"]
+    )
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# Create tables if they don't exist
+def create_tables():
+    """Create the database and base tables if missing and apply pending
+    migrations, returning the versions applied."""
+    create_database()
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        if DB_ENGINE == "sqlite":
+            conn.executescript(SQLITE_TABLES)
+        else:
+            _create_mysql_tables(cursor)
+        conn.commit()
+        
+        return apply_migrations(conn)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _create_mysql_tables(cursor):
+    # Create users table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL UNIQUE,
+        password VARCHAR(255) NOT NULL,
+        avatar VARCHAR(255),
+        role VARCHAR(50) DEFAULT 'user',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """)
+    
+    # Create categories table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS categories (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        slug VARCHAR(255) NOT NULL UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """)
+    
+    # Create tags table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS tags (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        slug VARCHAR(255) NOT NULL UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """)
+    
+    # Create posts table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS posts (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        content TEXT NOT NULL,
+        excerpt TEXT,
+        featured_image VARCHAR(255),
+        status VARCHAR(20) NOT NULL DEFAULT 'draft',
+        author_id INT NOT NULL,
+        reading_time INT DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        published_at TIMESTAMP NULL,
+        FOREIGN KEY (author_id) REFERENCES users(id)
+    )
+    """)
+    
+    # Create post_categories table (many-to-many)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS post_categories (
+        post_id INT NOT NULL,
+        category_id INT NOT NULL,
+        PRIMARY KEY (post_id, category_id),
+        FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
+        FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE
+    )
+    """)
+    
+    # Create post_tags table (many-to-many)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS post_tags (
+        post_id INT NOT NULL,
+        tag_id INT NOT NULL,
+        PRIMARY KEY (post_id, tag_id),
+        FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
+        FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+    )
+    """)
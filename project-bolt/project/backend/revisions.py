@@ -0,0 +1,204 @@
+"""Post revision history stored as compressed deltas.
+
+Every save of a post appends a row to ``post_revisions``. Most rows hold
+a zlib-compressed delta of the content against the previous revision;
+every ``REVISION_SNAPSHOT_INTERVAL`` revisions (or whenever a delta
+would not be smaller) a compressed full snapshot starts a new chain, so
+rebuilding any revision replays a bounded number of deltas.
+
+A delta is a JSON list of operations over the previous content split
+into tokens (tags, words, runs of whitespace, single punctuation marks):
+a positive int copies that many tokens, a negative int skips them, and a
+string is inserted as is.
+"""
+import difflib
+import hashlib
+import json
+import os
+import re
+import zlib
+
+# Revisions between two full snapshots of a post's content
+REVISION_SNAPSHOT_INTERVAL = int(os.getenv("REVISION_SNAPSHOT_INTERVAL", "20"))
+
+TOKEN_RE = re.compile(r"<[^>]*>|\w+|\s+|[^\w\s]", re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text)
+
+
+def make_delta(old, new):
+    """Return the operations turning ``old`` into ``new``."""
+    old_tokens, new_tokens = tokenize(old), tokenize(new)
+
+    # Edits between two saves are usually local; matching only the part
+    # between the common prefix and suffix keeps the diff cheap on long posts
+    prefix = 0
+    limit = min(len(old_tokens), len(new_tokens))
+    while prefix < limit and old_tokens[prefix] == new_tokens[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and old_tokens[-suffix - 1] == new_tokens[-suffix - 1]):
+        suffix += 1
+
+    ops = [prefix] if prefix else []
+    matcher = difflib.SequenceMatcher(
+        None,
+        old_tokens[prefix:len(old_tokens) - suffix],
+        new_tokens[prefix:len(new_tokens) - suffix],
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append("".join(new_tokens[prefix + j1:prefix + j2]))
+    if suffix:
+        ops.append(suffix)
+    return ops
+
+
+def apply_delta(old, ops):
+    tokens = tokenize(old)
+    position = 0
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        elif op > 0:
+            parts.append("".join(tokens[position:position + op]))
+            position += op
+        else:
+            position -= op
+    return "".join(parts)
+
+
+def _content_hash(content):
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def record_revision(cursor, post_id, previous_content, title, content, excerpt,
+                    featured_image, categories, tags):
+    """Append a revision for a save of post ``post_id`` in the current transaction.
+
+    ``previous_content`` is the content the save replaces (None for a new
+    post). It is diffed against only when it is what the latest revision
+    holds; otherwise, e.g. for posts that predate revision history, a
+    snapshot is stored.
+    """
+    cursor.execute("""
+    SELECT revision, base_revision, content_hash FROM post_revisions
+    WHERE post_id = %s
+    ORDER BY revision DESC
+    LIMIT 1
+    """, (post_id,))
+    latest = cursor.fetchone()
+
+    snapshot = zlib.compress(content.encode())
+    kind, data = "snapshot", snapshot
+    revision = base_revision = latest[0] + 1 if latest else 1
+    if (
+        latest
+        and previous_content is not None
+        and latest[2] == _content_hash(previous_content)
+        and revision - latest[1] < REVISION_SNAPSHOT_INTERVAL
+    ):
+        delta = zlib.compress(json.dumps(make_delta(previous_content, content)).encode())
+        if len(delta) < len(snapshot):
+            kind, data, base_revision = "delta", delta, latest[1]
+
+    meta = {
+        "excerpt": excerpt,
+        "featured_image": featured_image,
+        "categories": categories,
+        "tags": tags,
+    }
+    cursor.execute("""
+    INSERT INTO post_revisions (
+        post_id, revision, base_revision, kind, data, title, meta,
+        content_hash, content_length
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, (
+        post_id, revision, base_revision, kind, data, title, json.dumps(meta),
+        _content_hash(content), len(content)
+    ))
+    return revision
+
+
+def record_first_revisions(cursor, posts):
+    """Store revision 1 of many new posts in one statement.
+
+    ``posts`` are dicts with the post's id, title, content, excerpt,
+    featured_image, categories and tags.
+    """
+    if not posts:
+        return
+    params = []
+    for post in posts:
+        meta = {key: post[key] for key in ("excerpt", "featured_image", "categories", "tags")}
+        params.extend((
+            post["id"], 1, 1, "snapshot", zlib.compress(post["content"].encode()),
+            post["title"], json.dumps(meta),
+            _content_hash(post["content"]), len(post["content"])
+        ))
+    cursor.execute(f"""
+    INSERT INTO post_revisions (
+        post_id, revision, base_revision, kind, data, title, meta,
+        content_hash, content_length
+    ) VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(posts))}
+    """, params)
+
+
+def list_revisions(cursor, post_id):
+    """Return the revisions of a post, newest first, without their content."""
+    cursor.execute("""
+    SELECT revision, kind, title, content_length, LENGTH(data) AS stored_bytes, created_at
+    FROM post_revisions
+    WHERE post_id = %s
+    ORDER BY revision DESC
+    """, (post_id,))
+    return [
+        {
+            "revision": revision,
+            "kind": kind,
+            "title": title,
+            "content_length": content_length,
+            "stored_bytes": stored_bytes,
+            "created_at": created_at,
+        }
+        for revision, kind, title, content_length, stored_bytes, created_at in cursor.fetchall()
+    ]
+
+
+def load_revision(cursor, post_id, revision):
+    """Rebuild one revision of a post, or return None if it doesn't exist."""
+    cursor.execute("""
+    SELECT base_revision, title, meta, created_at FROM post_revisions
+    WHERE post_id = %s AND revision = %s
+    """, (post_id, revision))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    base_revision, title, meta, created_at = row
+
+    cursor.execute("""
+    SELECT kind, data FROM post_revisions
+    WHERE post_id = %s AND revision BETWEEN %s AND %s
+    ORDER BY revision
+    """, (post_id, base_revision, revision))
+    content = ""
+    for kind, data in cursor.fetchall():
+        data = zlib.decompress(data).decode()
+        content = data if kind == "snapshot" else apply_delta(content, json.loads(data))
+
+    return {
+        "revision": revision,
+        "title": title,
+        "content": content,
+        "created_at": created_at,
+        **json.loads(meta),
+    }
@@ -0,0 +1,58 @@
+"""Helpers for full-text post search."""
+import html
+import re
+
+TAG_RE = re.compile(r"<[^>]*>")
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+SPACE_RE = re.compile(r"\s+")
+
+# Characters of context kept around the first match in a highlight
+HIGHLIGHT_CONTEXT = 80
+
+
+def query_terms(query):
+    """Split a search query into the lower-cased words worth highlighting."""
+    return sorted({word.lower() for word in WORD_RE.findall(query) if len(word) > 1},
+                  key=len, reverse=True)
+
+
+def fts_query(query):
+    """Build an SQLite FTS5 MATCH expression matching any word of ``query``.
+
+    Each word is quoted, so operators and punctuation in user input are
+    searched for rather than interpreted.
+    """
+    return " OR ".join(f'"{word}"' for word in query_terms(query))
+
+
+def plain_text(markup):
+    """Strip tags and entities from stored post HTML."""
+    return SPACE_RE.sub(" ", html.unescape(TAG_RE.sub(" ", markup or ""))).strip()
+
+
+def highlight(text, terms, context=HIGHLIGHT_CONTEXT):
+    """Return an HTML-escaped snippet of ``text`` around the first matching
+    term, with every match wrapped in ``<mark>``."""
+    if not text:
+        return ""
+    if not terms:
+        return html.escape(text[:2 * context])
+
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    first = pattern.search(text)
+    if first is None:
+        return html.escape(text[:2 * context])
+
+    start = max(0, first.start() - context)
+    end = min(len(text), first.end() + context)
+    snippet = text[start:end]
+
+    parts = []
+    position = 0
+    for match in pattern.finditer(snippet):
+        parts.append(html.escape(snippet[position:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        position = match.end()
+    parts.append(html.escape(snippet[position:]))
+
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(text) else "")
@@ -0,0 +1,194 @@
+"""Embedded SQLite storage engine, selected with ``DB_ENGINE=sqlite``.
+
+``connect`` returns a connection with the subset of the mysql.connector
+interface the application uses: ``cursor(dictionary=..., buffered=...)``,
+``start_transaction``, ``in_transaction``, ``is_connected``, and cursors
+reporting the first id of a multi-row INSERT as ``lastrowid``. Statements
+are written for MySQL and translated on the way in (``%s`` placeholders,
+``NOW(6)``, ``FOR UPDATE``, ``INSERT IGNORE`` and no-op ``ON DUPLICATE
+KEY UPDATE``); anything else must already be portable. SQLite errors are
+raised as their mysql.connector counterparts, with the MySQL error numbers
+callers check for.
+
+The database runs in WAL mode, so readers never block the single writer.
+Writes take the write lock when their transaction begins (``BEGIN
+IMMEDIATE``), which makes ``SELECT ... FOR UPDATE`` unnecessary and avoids
+lock upgrades failing under concurrency.
+"""
+from datetime import datetime
+import functools
+import re
+import sqlite3
+
+from mysql.connector import errors
+
+# How long a writer waits for the write lock before failing
+BUSY_TIMEOUT_MS = 5000
+
+# Timestamps are stored as text with microseconds, so they sort and compare
+# correctly as strings whether written by SQLite or bound from Python
+NOW = "STRFTIME('%Y-%m-%d %H:%M:%f000', 'now')"
+
+_TRANSLATIONS = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bNOW\(6\)"), NOW),
+    (re.compile(r"\s+FOR UPDATE\b"), ""),
+    (re.compile(r"\bINSERT IGNORE\b"), "INSERT OR IGNORE"),
+    (re.compile(r"\bON DUPLICATE KEY UPDATE\s+(\w+)\s*=\s*\1\s*$"), "ON CONFLICT DO NOTHING"),
+]
+
+
+def _adapt_datetime(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _convert_timestamp(value):
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_converter("TIMESTAMP", _convert_timestamp)
+
+
+@functools.lru_cache(maxsize=512)
+def translate(operation):
+    """Rewrite a MySQL statement for SQLite."""
+    for pattern, replacement in _TRANSLATIONS:
+        operation = pattern.sub(replacement, operation)
+    return operation
+
+
+def _mysql_error(e):
+    """Return the mysql.connector error matching a sqlite3 error."""
+    message = str(e)
+    if isinstance(e, sqlite3.IntegrityError):
+        errno = None
+        if message.startswith("UNIQUE") or message.startswith("PRIMARY KEY"):
+            errno = 1062  # Duplicate entry
+        elif message.startswith("FOREIGN KEY"):
+            errno = 1452  # Cannot add or update a child row
+        return errors.IntegrityError(msg=message, errno=errno)
+    if message.startswith("duplicate column name"):
+        return errors.ProgrammingError(msg=message, errno=1060)
+    if isinstance(e, sqlite3.OperationalError):
+        return errors.OperationalError(msg=message)
+    return errors.DatabaseError(msg=message)
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        if dictionary:
+            cursor.row_factory = _dict_row
+        self._first_id = None
+
+    def execute(self, operation, params=()):
+        try:
+            self._cursor.execute(translate(operation), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+        self._first_id = None
+        if self._cursor.rowcount > 1 and operation.lstrip()[:6].upper() == "INSERT":
+            # Like InnoDB, report the first id of a multi-row INSERT; rows
+            # inserted under one write lock get consecutive rowids
+            self._first_id = self._cursor.lastrowid - self._cursor.rowcount + 1
+
+    def executemany(self, operation, seq_params):
+        try:
+            self._cursor.executemany(translate(operation), [tuple(params) for params in seq_params])
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+        self._first_id = None
+
+    @property
+    def lastrowid(self):
+        return self._first_id if self._first_id is not None else self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class SQLiteConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, buffered=None):
+        # SQLite cursors step through results lazily, so ``buffered`` has
+        # no effect
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def start_transaction(self, consistent_snapshot=False, readonly=False, **kwargs):
+        if self._conn.in_transaction:
+            raise errors.ProgrammingError("Transaction already in progress")
+        # A deferred transaction reads from one WAL snapshot until it ends
+        self._conn.execute("BEGIN" if readonly else "BEGIN IMMEDIATE")
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def is_connected(self):
+        try:
+            self._conn.execute("SELECT 1")
+        except sqlite3.Error:
+            return False
+        return True
+
+    def executescript(self, script):
+        try:
+            self._conn.executescript(script)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def commit(self):
+        try:
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(path):
+    """Open ``path`` (created if missing) in WAL mode."""
+    conn = sqlite3.connect(
+        path,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        # Pooled connections move between executor threads, one at a time
+        check_same_thread=False,
+        # Statements that write open a transaction holding the write lock
+        isolation_level="IMMEDIATE",
+        timeout=BUSY_TIMEOUT_MS / 1000,
+    )
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return SQLiteConnection(conn)
@@ -0,0 +1,72 @@
+"""Category and tag writes shared by the API and bulk import."""
+
+# Link table and column for each taxonomy table
+TAXONOMY_LINKS = {
+    "categories": ("post_categories", "category_id"),
+    "tags": ("post_tags", "tag_id"),
+}
+
+
+def slugify(name):
+    return name.lower().replace(" ", "-")
+
+
+def terms_by_name_query(table, names):
+    """Return the SQL and params selecting ``(id, name)`` of ``names`` in ``table``."""
+    return f"SELECT id, name FROM {table} WHERE name IN ({', '.join(['%s'] * len(names))})", list(names)
+
+
+def resolve_terms(cursor, table, names):
+    """Map names to ids in ``categories`` or ``tags``, creating missing rows.
+
+    Costs one SELECT when every name exists, otherwise one multi-row upsert
+    and one more SELECT, however many names are passed.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    cursor.execute(*terms_by_name_query(table, names))
+    existing = {name: term_id for term_id, name in cursor.fetchall()}
+    ids = {name: existing[name] for name in names if name in existing}
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return ids
+
+    slugs = {name: slugify(name) for name in missing}
+    params = []
+    for name in missing:
+        params.extend((name, slugs[name]))
+    cursor.execute(
+        f"INSERT INTO {table} (name, slug) VALUES {', '.join(['(%s, %s)'] * len(missing))}"
+        " ON DUPLICATE KEY UPDATE slug = slug",
+        params
+    )
+
+    # Slugs are unique, so reading back by slug also resolves names that
+    # collide with an existing term (e.g. differing only in case)
+    unique_slugs = list(set(slugs.values()))
+    cursor.execute(
+        f"SELECT id, slug FROM {table} WHERE slug IN ({', '.join(['%s'] * len(unique_slugs))})",
+        unique_slugs
+    )
+    by_slug = {slug: term_id for term_id, slug in cursor.fetchall()}
+    ids.update({name: by_slug[slugs[name]] for name in missing})
+    return ids
+
+
+def add_post_counts(cursor, table, counts):
+    """Add ``counts`` (a mapping of term id to posts gained) to ``post_count``
+    of ``table`` in one statement."""
+    if not counts:
+        return
+    # CASE rather than an UPDATE ... JOIN, which SQLite doesn't support
+    cases = " ".join(["WHEN %s THEN %s"] * len(counts))
+    params = []
+    for term_id, n in counts.items():
+        params.extend((term_id, n))
+    params.extend(counts)
+    cursor.execute(f"""
+    UPDATE {table} SET post_count = post_count + CASE id {cases} END
+    WHERE id IN ({', '.join(['%s'] * len(counts))})
+    """, params)
@@ -0,0 +1,92 @@
+"""Run the API against a temporary SQLite database.
+
+The engine is chosen when ``db`` is imported, so the environment is set
+before anything from the backend is.
+"""
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+_data_dir = tempfile.mkdtemp(prefix="blog-tests-")
+os.environ["DB_ENGINE"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_data_dir, "blog.db")
+os.environ.pop("DB_REPLICAS", None)
+# Write autosaves without waiting for more saves to coalesce
+os.environ["AUTOSAVE_COALESCE_MS"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from cache import response_cache, taxonomy_cache  # noqa: E402
+from db import connect  # noqa: E402
+from migrations import create_tables  # noqa: E402
+import main  # noqa: E402
+
+RESET_STATEMENTS = [
+    "DELETE FROM post_revisions",
+    "DELETE FROM post_categories",
+    "DELETE FROM post_tags",
+    "DELETE FROM posts",
+    "DELETE FROM categories",
+    "DELETE FROM tags",
+    "DELETE FROM feeds",
+]
+
+
+def _execute(statements, params=()):
+    conn = connect()
+    try:
+        cursor = conn.cursor()
+        for statement in statements:
+            cursor.execute(statement, params)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    create_tables()
+    _execute(
+        ["INSERT INTO users (id, name, email, password, avatar) VALUES (1, %s, %s, %s, %s)"],
+        ("Test Author", "author@example.com", "!", "https://example.com/avatar.png"),
+    )
+    with TestClient(main.app) as client:
+        yield client
+    shutil.rmtree(_data_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def api(client):
+    """The API client, with every post, category and tag deleted first."""
+    _execute(RESET_STATEMENTS)
+    taxonomy_cache.invalidate()
+    response_cache.clear()
+    return client
+
+
+def _queries_served(client, route):
+    """Return the number of queries run so far for requests to ``route``."""
+    match = re.search(
+        rf'^db_queries_per_request_sum{{route="{re.escape(route)}"}} (\S+)$',
+        client.get("/metrics").text, re.MULTILINE
+    )
+    return float(match.group(1)) if match else 0
+
+
+@pytest.fixture
+def count_queries(api):
+    """Return a function giving the number of queries ``GET path`` ran,
+    read from the per-request counter on ``/metrics``."""
+    def count(path):
+        route = path.split("?")[0]
+        before = _queries_served(api, route)
+        response = api.get(path)
+        assert response.status_code == 200, response.text
+        return _queries_served(api, route) - before
+    return count
@@ -0,0 +1,53 @@
+"""Autosave writes a draft only when it changed since the last save of any kind."""
+
+DRAFT = {"title": "Draft", "content": "<p>abc</p>", "categories": ["News"], "tags": ["x"]}
+
+
+def _autosave(api, **fields):
+    response = api.post("/api/drafts/autosave", json={**DRAFT, **fields})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _stored(api, post_id):
+    post = api.get(f"/api/posts/{post_id}").json()
+    revisions = api.get(f"/api/posts/{post_id}/revisions").json()
+    return post, len(revisions)
+
+
+def test_identical_autosave_writes_nothing(api):
+    draft = _autosave(api)
+    before, revisions = _stored(api, draft["id"])
+
+    again = _autosave(api, id=draft["id"])
+    after, revisions_after = _stored(api, draft["id"])
+    assert again["updated_at"] == after["updated_at"] == before["updated_at"]
+    assert revisions_after == revisions
+
+
+def test_autosave_after_update_is_written(api):
+    draft = _autosave(api)
+    updated = api.put(f"/api/posts/{draft['id']}", json={**DRAFT, "content": "<p>CHANGED</p>", "status": "draft"})
+    assert updated.status_code == 200, updated.text
+
+    # Repeats the body from before the update, so it differs from what's stored
+    saved = _autosave(api, id=draft["id"])
+    assert saved["content"] == DRAFT["content"]
+    assert _stored(api, draft["id"])[0]["content"] == DRAFT["content"]
+
+
+def test_autosave_after_restore_is_written(api):
+    draft = _autosave(api)
+    _autosave(api, id=draft["id"], content="<p>second</p>")
+    restored = api.post(f"/api/posts/{draft['id']}/revisions/1/restore")
+    assert restored.json()["content"] == DRAFT["content"]
+
+    # Repeats the body from before the restore
+    saved = _autosave(api, id=draft["id"], content="<p>second</p>")
+    assert saved["content"] == "<p>second</p>"
+    assert _stored(api, draft["id"])[0]["content"] == "<p>second</p>"
+
+
+def test_autosave_of_unknown_draft_is_not_found(api):
+    response = api.post("/api/drafts/autosave", json={**DRAFT, "id": 999999})
+    assert response.status_code == 404
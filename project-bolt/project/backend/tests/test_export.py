@@ -0,0 +1,29 @@
+"""Exports read on one connection match those streamed over two."""
+from db import connect
+from transfer import export_posts
+
+
+def _export(chunk_size, connections, status=None):
+    conns = [connect() for _ in range(connections)]
+    try:
+        return b"".join(export_posts(*conns, status=status, chunk_size=chunk_size))
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+def test_single_connection_export_matches_streamed_export(api):
+    for i in range(7):
+        response = api.post("/api/posts", json={
+            "title": f"Post {i}",
+            "content": f"<p>Body {i}</p>",
+            "status": "published" if i % 2 else "draft",
+            "categories": [f"Category {i % 2}"],
+            "tags": [f"tag-{i}"],
+        })
+        assert response.status_code == 201, response.text
+
+    for status in (None, "published"):
+        streamed = _export(3, 2, status)
+        assert _export(3, 1, status) == streamed
+        assert len(streamed.splitlines()) == (7 if status is None else 3)
@@ -0,0 +1,56 @@
+"""Stored feeds stay correct across writes and don't take locks for unknown terms."""
+from email.utils import parsedate_to_datetime
+import os
+import sqlite3
+import time
+
+
+def _publish(api, title, categories=()):
+    response = api.post("/api/posts", json={
+        "title": title,
+        "content": f"<p>{title}</p>",
+        "status": "published",
+        "categories": list(categories),
+        "tags": [],
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_deleting_the_newest_post_changes_the_feed(api):
+    _publish(api, "Older")
+    newest = _publish(api, "Newest")
+    first = api.get("/api/feeds/json")
+    assert [item["title"] for item in first.json()["items"]] == ["Newest", "Older"]
+
+    assert api.delete(f"/api/posts/{newest}").status_code == 204
+    for headers in (
+        {"If-None-Match": first.headers["etag"]},
+        {"If-Modified-Since": first.headers["last-modified"]},
+    ):
+        response = api.get("/api/feeds/json", headers=headers)
+        assert response.status_code == 200
+        assert [item["title"] for item in response.json()["items"]] == ["Older"]
+    assert (parsedate_to_datetime(response.headers["last-modified"])
+            >= parsedate_to_datetime(first.headers["last-modified"]))
+
+    unchanged = api.get("/api/feeds/json", headers={"If-None-Match": response.headers["etag"]})
+    assert unchanged.status_code == 304
+
+
+def test_unknown_term_feed_is_not_found_without_the_write_lock(api):
+    _publish(api, "Filed", ["Known"])
+    assert api.get("/api/feeds/categories/known/rss").status_code == 200
+
+    # Hold the database's write lock, as a long write would
+    writer = sqlite3.connect(os.environ["SQLITE_PATH"])
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        response = api.get("/api/feeds/categories/no-such-category/rss")
+        elapsed = time.monotonic() - started
+    finally:
+        writer.rollback()
+        writer.close()
+    assert response.status_code == 404
+    assert elapsed < 1
@@ -0,0 +1,32 @@
+"""Post listings run a fixed number of queries, however many posts they return."""
+import pytest
+
+
+def _create_posts(api, count, status):
+    for i in range(count):
+        response = api.post("/api/posts", json={
+            "title": f"{status} {i}",
+            "content": f"<p>Post number {i}</p>",
+            "status": status,
+            "categories": [f"Category {i % 3}", "Shared"],
+            "tags": [f"tag-{i}", f"tag-{i + 1}"],
+        })
+        assert response.status_code == 201, response.text
+
+
+@pytest.mark.parametrize("path, status", [
+    ("/api/posts", "published"),
+    ("/api/posts?view=summary", "published"),
+    ("/api/drafts", "draft"),
+    ("/api/drafts?view=summary", "draft"),
+])
+def test_listing_query_count_is_constant(api, count_queries, path, status):
+    _create_posts(api, 1, status)
+    one = count_queries(path)
+    assert len(api.get(path).json()) == 1
+
+    _create_posts(api, 9, status)
+    many = count_queries(path)
+    assert len(api.get(path).json()) == 10
+
+    assert 0 < one == many
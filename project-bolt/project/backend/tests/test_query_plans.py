@@ -0,0 +1,19 @@
+"""The hot list, filter and lookup queries read their tables through the expected indexes."""
+import pytest
+
+from db import connect
+from manage import explain_checks, index_used
+
+
+@pytest.mark.parametrize("query, params, table, expected", [
+    pytest.param(query, params, table, expected, id=name)
+    for name, query, params, table, expected in explain_checks()
+])
+def test_query_uses_index(client, query, params, table, expected):
+    conn = connect()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        assert index_used(cursor, query, params, table) in expected
+    finally:
+        cursor.close()
+        conn.close()
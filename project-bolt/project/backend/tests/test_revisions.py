@@ -0,0 +1,58 @@
+"""Every revision rebuilds to what was saved, across snapshots and deltas."""
+import revisions
+
+
+def _save(api, post_id, version):
+    body = {
+        "title": f"Post v{version}",
+        # Local edits to a shared body, so most revisions store as deltas
+        "content": "<p>" + " ".join(f"word{i}" for i in range(50)) + f"</p><p>Edit {version}, (again).</p>",
+        "excerpt": f"Excerpt {version}",
+        "featured_image": None,
+        "status": "published",
+        "categories": [f"Category {version % 2}"],
+        "tags": [f"tag-{version}", "shared"],
+    }
+    if post_id is None:
+        response = api.post("/api/posts", json=body)
+    else:
+        response = api.put(f"/api/posts/{post_id}", json=body)
+    assert response.status_code in (200, 201), response.text
+    return response.json()["id"], body
+
+
+def _counts(api, kind):
+    return {term["name"]: term["count"] for term in api.get(f"/api/{kind}").json()}
+
+
+def test_revisions_round_trip_and_restore(api, monkeypatch):
+    monkeypatch.setattr(revisions, "REVISION_SNAPSHOT_INTERVAL", 3)
+    post_id, saved = None, []
+    for version in range(8):
+        post_id, body = _save(api, post_id, version)
+        saved.append(body)
+
+    history = api.get(f"/api/posts/{post_id}/revisions").json()
+    assert [entry["revision"] for entry in history] == list(range(8, 0, -1))
+    assert {entry["kind"] for entry in history} == {"snapshot", "delta"}
+
+    for revision, body in enumerate(saved, start=1):
+        stored = api.get(f"/api/posts/{post_id}/revisions/{revision}").json()
+        for field in ("title", "content", "excerpt", "featured_image"):
+            assert stored[field] == body[field]
+        assert sorted(stored["categories"]) == sorted(body["categories"])
+        assert sorted(stored["tags"]) == sorted(body["tags"])
+
+    restored = api.post(f"/api/posts/{post_id}/revisions/2/restore")
+    assert restored.status_code == 200, restored.text
+    assert restored.json()["content"] == saved[1]["content"]
+    assert len(api.get(f"/api/posts/{post_id}/revisions").json()) == 9
+    assert api.get(f"/api/posts/{post_id}/revisions/9").json()["content"] == saved[1]["content"]
+
+    # Only the restored revision's terms count the post
+    categories = _counts(api, "categories")
+    assert categories["Category 1"] == 1
+    assert categories.get("Category 0", 0) == 0
+    tags = _counts(api, "tags")
+    assert tags["tag-1"] == 1 and tags["shared"] == 1
+    assert tags.get("tag-7", 0) == 0
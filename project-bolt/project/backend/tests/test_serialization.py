@@ -0,0 +1,81 @@
+"""Read endpoints skip response validation; their orjson output must match the
+document FastAPI would produce from the response_model."""
+from datetime import timezone
+import json
+from typing import List, Union
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+import pytest
+
+from db import connect
+import main
+
+LIST_ADAPTER = TypeAdapter(Union[List[main.Post], List[main.PostSummary]])
+SEARCH_ADAPTER = TypeAdapter(List[main.SearchResult])
+POST_ADAPTER = TypeAdapter(main.Post)
+
+
+def _validated_body(adapter, content):
+    """What FastAPI sends for a handler returning ``content`` with a response_model."""
+    return json.dumps(jsonable_encoder(adapter.validate_python(content)), ensure_ascii=False)
+
+
+def _assert_parity(adapter, content):
+    assert json.loads(main._json_body(content)) == json.loads(_validated_body(adapter, content))
+
+
+@pytest.fixture(params=["https://example.com/avatar.png", None], ids=["avatar", "no_avatar"])
+def conn(api, request):
+    """A connection to a database holding a few posts by an author with or without an avatar."""
+    for i, status in enumerate(["published", "published", "draft"]):
+        response = api.post("/api/posts", json={
+            "title": f"Searchable \"{i}\" — ünïcode & <markup>",
+            "content": f"<p>Searchable body {i}</p>",
+            "excerpt": None if i == 0 else f"Excerpt {i}",
+            "featured_image": None if i % 2 else f"https://example.com/{i}.jpg",
+            "status": status,
+            "categories": ["Development", "News"][:i],
+            "tags": [f"tag-{i}"],
+        })
+        assert response.status_code == 201, response.text
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT avatar FROM users WHERE id = 1")
+    (saved_avatar,) = cursor.fetchone()
+    cursor.execute("UPDATE users SET avatar = %s WHERE id = 1", (request.param,))
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        cursor.execute("UPDATE users SET avatar = %s WHERE id = 1", (saved_avatar,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+
+@pytest.mark.parametrize("summary", [False, True], ids=["full", "summary"])
+def test_post_list_parity(conn, summary):
+    posts, _ = main._get_posts(conn, None, None, None, summary=summary)
+    assert len(posts) == 3
+    _assert_parity(LIST_ADAPTER, posts)
+
+    drafts, _ = main._get_drafts(conn, summary=summary)
+    assert len(drafts) == 1
+    _assert_parity(LIST_ADAPTER, drafts)
+
+
+def test_search_parity(conn):
+    results, _ = main._search_posts(conn, "searchable", None, 20, 0)
+    assert len(results) == 3
+    _assert_parity(SEARCH_ADAPTER, results)
+
+
+def test_single_post_parity(conn):
+    posts, _ = main._get_posts(conn, None, None, None)
+    post = main._get_post(conn, posts[0]["id"])
+    _assert_parity(POST_ADAPTER, post)
+
+    post["updated_at"] = post["updated_at"].replace(tzinfo=timezone.utc)
+    _assert_parity(POST_ADAPTER, post)
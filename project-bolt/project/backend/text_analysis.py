@@ -0,0 +1,122 @@
+"""Word count, reading time and excerpt of post HTML.
+
+Post bodies are scanned once with a regex tokenizer that drops markup,
+comments and script/style contents, decodes entities and separates the
+text of block elements, while inline elements (``<b>wo</b>rd``) don't
+split words. Results are cached by a hash of the content, so autosaves
+that don't touch the body don't scan it again.
+"""
+from collections import OrderedDict, namedtuple
+import hashlib
+import html
+import math
+import os
+import re
+import threading
+
+WORDS_PER_MINUTE = int(os.getenv("READING_WORDS_PER_MINUTE", "200"))
+EXCERPT_LENGTH = int(os.getenv("AUTO_EXCERPT_LENGTH", "200"))
+ANALYSIS_CACHE_SIZE = int(os.getenv("TEXT_ANALYSIS_CACHE_SIZE", "1024"))
+
+TOKEN_RE = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][\w:-]*)[^>]*>|<[^>]*>|[^<]+", re.DOTALL)
+SPACE_RE = re.compile(r"\s+")
+
+# Elements whose boundaries separate words
+BLOCK_TAGS = frozenset((
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "img", "li", "main", "nav", "ol", "p", "pre", "section", "table", "td",
+    "th", "tr", "ul",
+))
+# Elements whose contents aren't text
+SKIPPED_TAGS = frozenset(("script", "style", "template"))
+
+TextStats = namedtuple("TextStats", "words reading_time excerpt")
+
+
+def extract_text(markup):
+    """Return the visible text of ``markup`` with whitespace collapsed."""
+    parts = []
+    skipping = None
+    for match in TOKEN_RE.finditer(markup or ""):
+        name = match.group(2)
+        if name is None:
+            token = match.group()
+            if skipping is None and not token.startswith("<"):
+                parts.append(token)
+            continue
+        name = name.lower()
+        closing = match.group(1) == "/"
+        if skipping is not None:
+            if closing and name == skipping:
+                skipping = None
+        elif name in SKIPPED_TAGS and not closing:
+            skipping = name
+        elif name in BLOCK_TAGS:
+            parts.append(" ")
+    return SPACE_RE.sub(" ", html.unescape("".join(parts))).strip()
+
+
+def excerpt_of(text, length=EXCERPT_LENGTH):
+    """Cut ``text`` to at most ``length`` characters at a word boundary."""
+    if len(text) <= length:
+        return text
+    cut = text[:length + 1]
+    cut = cut.rsplit(" ", 1)[0] if " " in cut else text[:length]
+    return cut.rstrip(" ,;:.-") + "…"
+
+
+def analyze_text(content):
+    """Compute the ``TextStats`` of post HTML without the cache."""
+    text = extract_text(content)
+    words = len(text.split())
+    return TextStats(
+        words=words,
+        reading_time=max(1, math.ceil(words / WORDS_PER_MINUTE)),
+        excerpt=excerpt_of(text) or None,
+    )
+
+
+class AnalysisCache:
+    """A thread-safe LRU of ``TextStats`` keyed by content digest."""
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def analyze(self, content):
+        key = hashlib.blake2b(content.encode(), digest_size=16).digest()
+        with self._lock:
+            stats = self._entries.get(key)
+            if stats is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return stats
+            self._misses += 1
+
+        stats = analyze_text(content)
+        with self._lock:
+            self._entries[key] = stats
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return stats
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+analysis_cache = AnalysisCache(ANALYSIS_CACHE_SIZE)
+
+
+def analyze(content):
+    """Return the ``TextStats`` of post HTML, reusing the result for content seen recently."""
+    return analysis_cache.analyze(content)
@@ -0,0 +1,337 @@
+"""Bulk export and import of posts as NDJSON.
+
+Each line of an export is one JSON object per post with its content,
+author id, timestamps and category and tag names. Imports read the same
+format; only ``title`` and ``content`` are required.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+import json
+import os
+
+import mysql.connector
+
+from autosave import content_hash, taxonomy_hash
+from db import DB_ENGINE
+from feeds import invalidate_feeds, post_feed_scopes
+from revisions import record_first_revisions
+from taxonomy import TAXONOMY_LINKS, add_post_counts, resolve_terms
+from text_analysis import analyze_text
+
+# Posts read from the server, serialized and handed on per chunk
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))
+
+# Posts inserted per transaction by a bulk import
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+IMPORT_STATUSES = ("draft", "published")
+
+EXPORT_COLUMNS = """id, title, content, excerpt, featured_image, status, author_id,
+    reading_time, created_at, updated_at, published_at"""
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _chunk_taxonomy(cursor, post_ids):
+    """Return category and tag names keyed by post id for one chunk."""
+    placeholders = ", ".join(["%s"] * len(post_ids))
+    names = {}
+    for key, query in (
+        ("categories", f"""SELECT pc.post_id, c.name FROM post_categories pc
+            JOIN categories c ON c.id = pc.category_id
+            WHERE pc.post_id IN ({placeholders}) ORDER BY c.name"""),
+        ("tags", f"""SELECT pt.post_id, t.name FROM post_tags pt
+            JOIN tags t ON t.id = pt.tag_id
+            WHERE pt.post_id IN ({placeholders}) ORDER BY t.name"""),
+    ):
+        found = {post_id: [] for post_id in post_ids}
+        cursor.execute(query, post_ids)
+        for post_id, name in cursor.fetchall():
+            found[post_id].append(name)
+        names[key] = found
+    return names
+
+
+def export_posts(conn, taxonomy_conn=None, status=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the posts as NDJSON, one ``bytes`` chunk of up to ``chunk_size`` lines at a time.
+
+    Posts are read on ``conn`` in a consistent snapshot, so only one chunk
+    is held in memory however large the table is. With a
+    ``taxonomy_conn``, they stream from one unbuffered cursor and
+    taxonomy names are read on the other connection, since a connection
+    with an unread result can't run other queries. Without one, each
+    chunk is fetched by keyset on id and its names are read after it on
+    ``conn``.
+    """
+    conn.start_transaction(consistent_snapshot=True, readonly=True)
+    query = f"SELECT {EXPORT_COLUMNS} FROM posts"
+    params = []
+    if status:
+        query += " WHERE status = %s"
+        params.append(status)
+    if taxonomy_conn is None:
+        yield from _export_pages(conn, query, params, chunk_size)
+        return
+
+    cursor = conn.cursor(buffered=False, dictionary=True)
+    taxonomy_cursor = taxonomy_conn.cursor()
+    try:
+        cursor.execute(query + " ORDER BY id", params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield _export_chunk(taxonomy_cursor, rows)
+    finally:
+        taxonomy_cursor.close()
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            # Closed before the last row was read, e.g. the client went
+            # away; the pool discards the connection on release
+            pass
+
+
+def _export_pages(conn, query, params, chunk_size):
+    cursor = conn.cursor(dictionary=True)
+    taxonomy_cursor = conn.cursor()
+    query += (" AND" if params else " WHERE") + " id > %s ORDER BY id LIMIT %s"
+    try:
+        last_id = 0
+        while True:
+            cursor.execute(query, params + [last_id, chunk_size])
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            yield _export_chunk(taxonomy_cursor, rows)
+    finally:
+        taxonomy_cursor.close()
+        cursor.close()
+
+
+def _export_chunk(taxonomy_cursor, rows):
+    names = _chunk_taxonomy(taxonomy_cursor, [row["id"] for row in rows])
+    lines = []
+    for row in rows:
+        row["categories"] = names["categories"][row["id"]]
+        row["tags"] = names["tags"][row["id"]]
+        lines.append(json.dumps(row, default=_json_default, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode()
+
+
+class RecordError(ValueError):
+    """An import line that doesn't describe a valid post."""
+
+
+def _timestamp(record, key):
+    value = record.get(key)
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        raise RecordError(f"{key} is not an ISO 8601 timestamp")
+    # Naive timestamps are taken as UTC, the session time zone
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_record(line):
+    """Validate one NDJSON line and return the post row it describes."""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise RecordError(f"Invalid JSON: {e}")
+    if not isinstance(record, dict):
+        raise RecordError("Expected a JSON object")
+
+    title = record.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise RecordError("title is required")
+    if len(title) > 255:
+        raise RecordError("title is longer than 255 characters")
+    content = record.get("content")
+    if not isinstance(content, str):
+        raise RecordError("content is required")
+    status = record.get("status", "draft")
+    if status not in IMPORT_STATUSES:
+        raise RecordError(f"status must be one of {', '.join(IMPORT_STATUSES)}")
+
+    post = {"title": title, "content": content, "status": status}
+    for key in ("excerpt", "featured_image"):
+        value = record.get(key)
+        if value is not None and not isinstance(value, str):
+            raise RecordError(f"{key} must be a string")
+        post[key] = value
+    for key in ("categories", "tags"):
+        names = record.get(key) or []
+        if not isinstance(names, list) or not all(isinstance(name, str) and name for name in names):
+            raise RecordError(f"{key} must be a list of names")
+        post[key] = list(dict.fromkeys(names))
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    post["created_at"] = _timestamp(record, "created_at") or now
+    post["updated_at"] = _timestamp(record, "updated_at") or post["created_at"]
+    post["published_at"] = _timestamp(record, "published_at") or (
+        post["created_at"] if status == "published" else None
+    )
+    # Bulk content is seen once, so it bypasses the analysis cache
+    text = analyze_text(content)
+    post["reading_time"] = text.reading_time
+    post["excerpt"] = post["excerpt"] or text.excerpt
+    return post
+
+
+def _consecutive_ids(cursor):
+    """Return whether the rows of a multi-row INSERT get consecutive ids.
+
+    InnoDB only guarantees it with an auto-increment step of 1 and the
+    traditional or consecutive lock mode; with interleaved mode (2, the
+    MySQL 8 default) concurrent inserts can take ids in between. SQLite
+    writes a statement's rows under one write lock.
+    """
+    if DB_ENGINE == "sqlite":
+        return True
+    cursor.execute("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode")
+    increment, lock_mode = cursor.fetchone()
+    return increment == 1 and lock_mode in (0, 1)
+
+
+def _insert_posts(conn, posts):
+    """Insert ``posts`` and their taxonomy links in one transaction.
+
+    Taxonomy names are resolved once for the whole batch, and posts,
+    links, post counts and first revisions are each written with a
+    single multi-row statement.
+    """
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        term_ids = {
+            table: resolve_terms(cursor, table, [name for post in posts for name in post[table]])
+            for table in TAXONOMY_LINKS
+        }
+
+        rows = [
+            (
+                post["title"], post["content"], post["excerpt"], post["featured_image"],
+                post["status"], 1,  # Hardcoded author_id, as for posts created through the API
+                post["reading_time"], post["created_at"], post["updated_at"], post["published_at"],
+                content_hash(post["title"], post["content"], post["excerpt"], post["featured_image"]),
+                taxonomy_hash(post["categories"], post["tags"]),
+            )
+            for post in posts
+        ]
+        insert = """
+        INSERT INTO posts (
+            title, content, excerpt, featured_image, status, author_id, reading_time,
+            created_at, updated_at, published_at, content_hash, taxonomy_hash
+        ) VALUES """
+        placeholders = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+        if _consecutive_ids(cursor):
+            # The statement's rows get consecutive ids, starting at the
+            # one reported for it
+            cursor.execute(insert + ", ".join([placeholders] * len(rows)),
+                           [value for row in rows for value in row])
+            for offset, post in enumerate(posts):
+                post["id"] = cursor.lastrowid + offset
+        else:
+            # One statement per row, each reporting its own id
+            for post, row in zip(posts, rows):
+                cursor.execute(insert + placeholders, row)
+                post["id"] = cursor.lastrowid
+
+        for table, (link_table, column) in TAXONOMY_LINKS.items():
+            # Names differing only in case can resolve to the same term
+            links = sorted({
+                (post["id"], term_ids[table][name]) for post in posts for name in post[table]
+            })
+            if not links:
+                continue
+            cursor.execute(
+                f"INSERT INTO {link_table} (post_id, {column}) VALUES "
+                + ", ".join(["(%s, %s)"] * len(links)),
+                [value for link in links for value in link]
+            )
+            add_post_counts(cursor, table, Counter(term_id for _, term_id in links))
+
+        published = [post["id"] for post in posts if post["status"] == "published"]
+        if published:
+            invalidate_feeds(cursor, post_feed_scopes(cursor, published))
+        record_first_revisions(cursor, posts)
+        cursor.execute(
+            "UPDATE data_versions SET version = version + 1 WHERE name IN ('posts', 'taxonomy')"
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def import_lines(conn, lines):
+    """Import one batch of ``(line number, text)`` pairs.
+
+    Returns the number of posts imported and a list of per-line errors.
+    When the batch's transaction fails, its lines are retried one at a
+    time so that only the offending ones are reported and skipped.
+    """
+    records = []
+    errors = []
+    for number, line in lines:
+        try:
+            records.append((number, parse_record(line)))
+        except RecordError as e:
+            errors.append({"line": number, "error": str(e)})
+    if not records:
+        return 0, errors
+
+    try:
+        _insert_posts(conn, [post for _, post in records])
+        return len(records), errors
+    except mysql.connector.Error as e:
+        if len(records) == 1:
+            errors.append({"line": records[0][0], "error": e.msg})
+            return 0, errors
+
+    imported = 0
+    for number, post in records:
+        try:
+            _insert_posts(conn, [post])
+            imported += 1
+        except mysql.connector.Error as e:
+            errors.append({"line": number, "error": e.msg})
+    errors.sort(key=lambda error: error["line"])
+    return imported, errors
+
+
+def import_posts(conn, lines, batch_size=IMPORT_BATCH_SIZE):
+    """Import every post in an iterable of NDJSON lines, ``batch_size`` per transaction.
+
+    Returns a summary with the number of posts imported and the errors
+    of the lines that were skipped.
+    """
+    imported = 0
+    errors = []
+    batch = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        batch.append((number, line))
+        if len(batch) >= batch_size:
+            count, batch_errors = import_lines(conn, batch)
+            imported += count
+            errors.extend(batch_errors)
+            batch = []
+    if batch:
+        count, batch_errors = import_lines(conn, batch)
+        imported += count
+        errors.extend(batch_errors)
+    return {"imported": imported, "failed": len(errors), "errors": errors}
@@ -46,7 +46,7 @@ const BlogPreview: React.FC<BlogPreviewProps> = ({ post, onBack }) => {
             <div className="flex items-center">
               <div className="h-8 w-8 rounded-full overflow-hidden mr-2">
                 <img
-                  src={publishedPost.author.avatar}
+                  src={publishedPost.author.avatar || `https://ui-avatars.com/api/?name=${encodeURIComponent(publishedPost.author.name)}&background=random`}
                   alt={publishedPost.author.name}
                   className="h-full w-full object-cover"
                 />
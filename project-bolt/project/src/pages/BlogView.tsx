@@ -102,7 +102,7 @@ const BlogView: React.FC = () => {
           <div className="flex items-center">
             <div className="h-8 w-8 rounded-full overflow-hidden mr-2">
               <img
-                src={currentPost.author.avatar}
+                src={currentPost.author.avatar || `https://ui-avatars.com/api/?name=${encodeURIComponent(currentPost.author.name)}&background=random`}
                 alt={currentPost.author.name}
                 className="h-full w-full object-cover"
               />
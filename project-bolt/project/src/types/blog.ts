@@ -10,7 +10,7 @@ export interface BlogPost {
   author: {
     id: number;
     name: string;
-    avatar: string;
+    avatar: string | null;
   };
   createdAt: string;
   updatedAt: string;